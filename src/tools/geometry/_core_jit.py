@@ -0,0 +1,64 @@
+"""
+Kernel scalar biên dịch bằng Numba cho geometry core.
+
+Numba là phụ thuộc tuỳ chọn: nếu không cài, module vẫn import được và
+geometry/core.py tự rơi về đường thuần Python. Khi có Numba, các hàm
+dưới đây được LLVM compile (cache trên đĩa) và warmup ngay lúc import
+để trả chi phí compile một lần duy nhất.
+"""
+from math import floor
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):  # decorator no-op khi thiếu numba
+        def wrap(fn):
+            return fn
+        return wrap
+
+
+@njit(cache=True)
+def snap_to_safe_jit(x: float, y: float, w: float, h: float,
+                        safe_left: int, safe_right: int,
+                        safe_top: int, safe_bottom: int,
+                        safe_w: int, safe_h: int,
+                        cw: int, ch: int):
+    if w > safe_w:
+        x_new = int(floor(max(0.0, min(float(cw) - w, float(safe_left))) + 0.5))
+    else:
+        x_new = int(floor(max(float(safe_left), min(float(safe_right) - w, x)) + 0.5))
+
+    if h > safe_h:
+        y_new = int(floor(max(0.0, min(float(ch) - h, float(safe_top))) + 0.5))
+    else:
+        y_new = int(floor(max(float(safe_top), min(float(safe_bottom) - h, y)) + 0.5))
+
+    return x_new, y_new, int(floor(w + 0.5)), int(floor(h + 0.5))
+
+
+@njit(cache=True)
+def fit_into_rect_jit(src_w: float, src_h: float,
+                        dx: float, dy: float, dw: float, dh: float,
+                        cover: bool):
+    if cover:
+        scale = max(dw / src_w, dh / src_h)
+    else:
+        scale = min(dw / src_w, dh / src_h)
+
+    w = src_w * scale
+    h = src_h * scale
+    x = dx + (dw - w) / 2.0
+    y = dy + (dh - h) / 2.0
+
+    w_i = max(1, int(floor(w + 0.5)))
+    h_i = max(1, int(floor(h + 0.5)))
+    return int(floor(x + 0.5)), int(floor(y + 0.5)), w_i, h_i
+
+
+if HAS_NUMBA:
+    # warmup: compile ngay lúc import thay vì lần gọi đầu trong pipeline
+    snap_to_safe_jit(0.0, 0.0, 1.0, 1.0, 0, 10, 0, 10, 10, 10, 10, 10)
+    fit_into_rect_jit(1.0, 1.0, 0.0, 0.0, 1.0, 1.0, False)
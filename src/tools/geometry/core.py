@@ -1,7 +1,27 @@
-from typing import Literal, Tuple
+from typing import Literal, Optional, Sequence, Tuple
+from functools import lru_cache
 import logging
-from tools.utils.basics import _clamp, _round_i
+import numpy as np
+from tools.utils.basics import _round_i
 from tools.schema.dataclass import Fonts, Style,Meta, Rect
+from . import _core_jit
+
+@lru_cache(maxsize=32)
+def _safe_box(meta: Meta) -> Tuple[int, int, int, int, int, int]:
+    """
+    Tính sẵn title-safe box cho một Meta (frozen nên hash được):
+    (safe_left, safe_right, safe_top, safe_bottom, safe_w, safe_h).
+    Meta bất biến nên chỉ cần tính một lần cho mỗi canvas.
+    """
+    cw, ch = meta.width, meta.height
+    m = meta.title_area
+    safe_left   = _round_i(cw * m)
+    safe_right  = cw - safe_left
+    safe_top    = _round_i(ch * m)
+    safe_bottom = ch - safe_top
+    safe_w = max(0, safe_right - safe_left)
+    safe_h = max(0, safe_bottom - safe_top)
+    return (safe_left, safe_right, safe_top, safe_bottom, safe_w, safe_h)
 
 # ---------- 1) snap_to_safe ----------
 def snap_to_safe(rect: Rect, meta: Meta) -> Rect:
@@ -24,33 +44,32 @@ def snap_to_safe(rect: Rect, meta: Meta) -> Rect:
     x, y, w, h = rect
     cw, ch = meta.width, meta.height
 
-    # Tính title-safe box (theo tỷ lệ biên mỗi cạnh)
-    m = meta.title_area
-    safe_left   = _round_i(cw * m)
-    safe_right  = cw - safe_left
-    safe_top    = _round_i(ch * m)
-    safe_bottom = ch - safe_top
+    # Title-safe box đã tính sẵn theo Meta (xem _safe_box)
+    safe_left, safe_right, safe_top, safe_bottom, safe_w, safe_h = _safe_box(meta)
 
-    # Nếu rect lớn hơn vùng title-safe, ta vẫn giữ w/h
-    # và chỉ đảm bảo không vượt canvas
-    safe_w = max(0, safe_right - safe_left)
-    safe_h = max(0, safe_bottom - safe_top)
+    if _core_jit.HAS_NUMBA:
+        return _core_jit.snap_to_safe_jit(
+            float(x), float(y), float(w), float(h),
+            safe_left, safe_right, safe_top, safe_bottom,
+            safe_w, safe_h, cw, ch)
+
+    # clamp/round inline (max/min + floor cục bộ) — tránh 6+ lần gọi hàm
+    # Python per rect trên đường nóng của batch scene build
+    _ri = _round_i
 
     if w > safe_w:
         # Không thể hoàn toàn nằm trong title-safe; bám mép trái title-safe
-        x_new = safe_left
-        # Nhưng vẫn phải đảm bảo không vượt canvas
-        x_new = _round_i(_clamp(x_new, 0, cw - w))
+        # nhưng vẫn phải đảm bảo không vượt canvas
+        x_new = _ri(max(0, min(cw - w, safe_left)))
     else:
-        x_new = _round_i(_clamp(x, safe_left, safe_right - w))
+        x_new = _ri(max(safe_left, min(safe_right - w, x)))
 
     if h > safe_h:
-        y_new = safe_top
-        y_new = _round_i(_clamp(y_new, 0, ch - h))
+        y_new = _ri(max(0, min(ch - h, safe_top)))
     else:
-        y_new = _round_i(_clamp(y, safe_top, safe_bottom - h))
+        y_new = _ri(max(safe_top, min(safe_bottom - h, y)))
 
-    return (x_new, y_new, _round_i(w), _round_i(h))
+    return (x_new, y_new, _ri(w), _ri(h))
 
 
 # ---------- 2) fit_into_rect ----------
@@ -77,6 +96,12 @@ def fit_into_rect(src_w: int, src_h: int, dst_rect: Rect, mode: str = "fit") ->
     if mode not in ("fit", "cover"):
         mode = "fit"
 
+    if _core_jit.HAS_NUMBA:
+        return _core_jit.fit_into_rect_jit(
+            float(src_w), float(src_h),
+            float(dx), float(dy), float(dw), float(dh),
+            mode == "cover")
+
     if mode == "fit":
         scale = min(dw / src_w, dh / src_h)
     else:  # cover
@@ -89,10 +114,11 @@ def fit_into_rect(src_w: int, src_h: int, dst_rect: Rect, mode: str = "fit") ->
     y = dy + (dh - h) / 2.0
 
     # làm tròn & đảm bảo không vượt hoàn toàn khỏi canvas con
-    w_i = max(1, _round_i(w))
-    h_i = max(1, _round_i(h))
-    x_i = _round_i(x)
-    y_i = _round_i(y)
+    _ri = _round_i
+    w_i = max(1, _ri(w))
+    h_i = max(1, _ri(h))
+    x_i = _ri(x)
+    y_i = _ri(y)
 
     return (x_i, y_i, w_i, h_i)
 
@@ -120,7 +146,129 @@ def place_in_rect(dst_rect: Rect, align: Literal["left", "center", "right"]) ->
         ax = _round_i(x)
     return ax, cy
 
-# ---------- 4) warn_if_upscale ----------
+def snap_to_safe_vec(rects: Sequence[Rect], meta: Meta) -> np.ndarray:
+    """
+    Bản vector hoá của snap_to_safe cho (N,4) rect — một lượt numpy
+    trên mảng liên tục thay vì N call Python, cùng ngữ nghĩa bản scalar
+    (chỉ tịnh tiến, rect to hơn safe box bám mép nhưng nằm trong canvas).
+
+    Returns:
+        (N,4) int32, cùng thứ tự đầu vào.
+    """
+    rects_a = np.atleast_2d(np.asarray(rects, dtype=np.float64))
+    if rects_a.size == 0:
+        # atleast_2d([]) cho (1,0) — unpack .T bên dưới nổ với list rỗng
+        return np.empty((0, 4), dtype=np.int32)
+    cw, ch = meta.width, meta.height
+    safe_left, safe_right, safe_top, safe_bottom, safe_w, safe_h = _safe_box(meta)
+
+    x, y, w, h = rects_a.T
+    x_in   = np.clip(x, safe_left, np.maximum(safe_left, safe_right - w))
+    x_over = np.clip(safe_left, 0, np.maximum(0, cw - w))
+    y_in   = np.clip(y, safe_top, np.maximum(safe_top, safe_bottom - h))
+    y_over = np.clip(safe_top, 0, np.maximum(0, ch - h))
+    x = np.where(w > safe_w, x_over, x_in)
+    y = np.where(h > safe_h, y_over, y_in)
+
+    # floor(v + 0.5) giống _round_i — np.rint làm tròn banker nên lệch 1px
+    # so với snap_to_safe scalar trên các tie .5
+    out = np.stack([np.floor(x + 0.5), np.floor(y + 0.5),
+                    np.floor(w + 0.5), np.floor(h + 0.5)], axis=1)
+    return out.astype(np.int32)
+
+# ---------- 4) batch_snap_and_fit ----------
+MODE_FIT = 0
+MODE_COVER = 1
+
+# SoA cho hot path: int32[4] liên tục thay vì tuple 4 PyLong mỗi rect.
+# Rect (NamedTuple) vẫn là kiểu public ở biên API.
+_RECT_DT = np.dtype([("x", "<i4"), ("y", "<i4"), ("w", "<i4"), ("h", "<i4")])
+
+def pack_rects(rects: Sequence[Rect]) -> np.ndarray:
+    """Đóng gói dãy Rect thành mảng structured _RECT_DT (int32, contiguous)."""
+    return np.asarray([tuple(r) for r in rects], dtype=_RECT_DT)
+
+def unpack_rects(arr: np.ndarray) -> list:
+    """Giải mảng structured _RECT_DT hoặc (N,4) int về list[Rect]."""
+    if arr.dtype == _RECT_DT:
+        arr = arr.view(np.int32).reshape(-1, 4)
+    return [Rect(int(x), int(y), int(w), int(h)) for x, y, w, h in arr]
+
+def batch_snap_and_fit(rects: Sequence[Rect],
+                        src_whs: Sequence[Tuple[int, int]],
+                        modes: Sequence[int],
+                        meta: Meta,
+                        snap_mask: Optional[Sequence[bool]] = None) -> np.ndarray:
+    """
+    Phiên bản vector hoá của snap_to_safe + fit_into_rect cho N graphics
+    trong một scene: một lần gọi NumPy thay vì N vòng lặp Python.
+
+    Args:
+        rects: (N,4) rect đích (x, y, w, h).
+        src_whs: (N,2) kích thước nguồn (src_w, src_h).
+        modes: (N,) mã mode (MODE_FIT | MODE_COVER).
+        meta: thông số canvas/safe.
+        snap_mask: (N,) bool — rect nào cần kẹp vào title-safe
+            (mặc định: tất cả).
+
+    Returns:
+        (N,4) int32 rect đã kẹp + fit + căn giữa, cùng thứ tự đầu vào.
+    """
+    if isinstance(rects, np.ndarray) and rects.dtype == _RECT_DT:
+        rects = np.ascontiguousarray(rects).view(np.int32).reshape(-1, 4)
+    rects_a = np.atleast_2d(np.asarray(rects, dtype=np.float64))
+    if rects_a.size == 0:
+        # scene không có graphics — atleast_2d([]) cho (1,0) nên unpack .T bên dưới nổ
+        return np.empty((0, 4), dtype=np.int32)
+    src_a = np.atleast_2d(np.asarray(src_whs, dtype=np.float64))
+    modes_a = np.asarray(modes)
+    n = rects_a.shape[0]
+    if snap_mask is None:
+        snap_a = np.ones(n, dtype=bool)
+    else:
+        snap_a = np.asarray(snap_mask, dtype=bool)
+
+    cw, ch = meta.width, meta.height
+    safe_left, safe_right, safe_top, safe_bottom, safe_w, safe_h = _safe_box(meta)
+
+    x, y, w, h = rects_a.T
+
+    # --- snap_to_safe: tịnh tiến (không co giãn), giống bản scalar ---
+    x_in   = np.clip(x, safe_left, np.maximum(safe_left, safe_right - w))
+    x_over = np.clip(safe_left, 0, np.maximum(0, cw - w))
+    y_in   = np.clip(y, safe_top, np.maximum(safe_top, safe_bottom - h))
+    y_over = np.clip(safe_top, 0, np.maximum(0, ch - h))
+    x = np.where(snap_a, np.where(w > safe_w, x_over, x_in), x)
+    y = np.where(snap_a, np.where(h > safe_h, y_over, y_in), y)
+
+    # --- fit_into_rect: fit/cover + căn giữa trong rect đích ---
+    sw, sh = src_a.T
+    valid = (sw > 0) & (sh > 0) & (w > 0) & (h > 0)
+    sw_s = np.where(valid, sw, 1.0)
+    sh_s = np.where(valid, sh, 1.0)
+    scale = np.where(modes_a == MODE_COVER,
+                        np.maximum(w / sw_s, h / sh_s),
+                        np.minimum(w / sw_s, h / sh_s))
+    # Làm tròn kiểu _round_i = floor(v + 0.5), KHÔNG dùng np.rint:
+    # rint làm tròn banker (0.5 -> chẵn) nên lệch 1px so với đường scalar
+    # trên các tie .5. Căn giữa cũng phải dùng kích thước CHƯA làm tròn
+    # (sw_s*scale) giống fit_into_rect, không phải fw/fh đã round.
+    fw_f = sw_s * scale
+    fh_f = sh_s * scale
+    fw = np.maximum(1, np.floor(fw_f + 0.5))
+    fh = np.maximum(1, np.floor(fh_f + 0.5))
+    fx = np.floor(x + (w - fw_f) / 2.0 + 0.5)
+    fy = np.floor(y + (h - fh_f) / 2.0 + 0.5)
+
+    out = np.stack([
+        np.where(valid, fx, np.floor(x + 0.5)),
+        np.where(valid, fy, np.floor(y + 0.5)),
+        np.where(valid, fw, 0),
+        np.where(valid, fh, 0),
+    ], axis=1)
+    return out.astype(np.int32)
+
+# ---------- 5) warn_if_upscale ----------
 def warn_if_upscale(src_wh: Tuple[int, int], dst_rect: Rect, limit: float = 1.5) -> None:
     """
     Cảnh báo (logging.warning) nếu tỉ lệ phóng đại vượt ngưỡng.
@@ -0,0 +1,52 @@
+"""
+Quản lý vòng đời các VideoFileClip đang mở.
+
+Mỗi VideoFileClip giữ một subprocess ffmpeg + buffer đọc trước; các
+build_* mở clip nhưng không thể close ngay vì composite còn cần reader
+khi render. Thay vào đó mọi clip mở được đăng ký qua weakref và
+close_all() dọn toàn bộ sau khi render xong — RSS bị chặn theo số clip
+đang hoạt động thay vì tích luỹ theo chiều dài timeline.
+
+Lưu ý: Clip của MoviePy 2.x định nghĩa __eq__ mà không có __hash__ nên
+KHÔNG hash được — không dùng WeakSet trực tiếp; registry giữ weakref.ref
+theo id(clip) và tự prune các ref đã chết.
+"""
+import logging
+import weakref
+from typing import Callable, Dict, List
+
+_OPEN_CLIPS: Dict[int, "weakref.ref"] = {}
+_CLEANUPS: List[Callable[[], None]] = []
+
+
+def register(clip):
+    """Đăng ký một clip đang mở để close_all() dọn sau khi render."""
+    key = id(clip)
+    _OPEN_CLIPS[key] = weakref.ref(clip, lambda _ref, _key=key: _OPEN_CLIPS.pop(_key, None))
+    return clip
+
+
+def on_close_all(fn: Callable[[], None]) -> Callable[[], None]:
+    """Thêm hook chạy kèm close_all() (vd: cache_clear của cache reader)."""
+    _CLEANUPS.append(fn)
+    return fn
+
+
+def close_all() -> int:
+    """Đóng mọi reader còn mở + chạy các hook dọn cache. Trả về số clip đã đóng."""
+    for fn in _CLEANUPS:
+        try:
+            fn()
+        except Exception:
+            logging.warning("close_all cleanup hook failed", exc_info=True)
+    n = 0
+    for key, ref in list(_OPEN_CLIPS.items()):
+        clip = ref()
+        if clip is not None:
+            try:
+                clip.close()
+                n += 1
+            except Exception:
+                logging.warning("close_all: could not close %r", clip, exc_info=True)
+        _OPEN_CLIPS.pop(key, None)
+    return n
@@ -1,21 +1,136 @@
 from __future__ import annotations
 from tools.schema.dataclass import Rect, Meta, GraphicSpec
-from typing import Tuple, Literal, List
+from typing import Tuple, Literal, List, Optional
 from functools import lru_cache
+from cachetools import LRUCache, cached
+import hashlib
+import json
 import os
 import logging
+import shutil
+import sqlite3
+import subprocess
+import threading
 from moviepy import VideoClip, ColorClip, VideoFileClip, ImageClip
 from PIL import Image
 import numpy as np
 from tools.geometry.core import fit_into_rect, warn_if_upscale,snap_to_safe, place_in_rect
 from utils import convert_color
+from . import _lifecycle
+
+try:
+    import pyvips  # decode SIMD/streaming, nhanh hơn Pillow cho ảnh lớn
+except ImportError:
+    pyvips = None
+
+try:
+    import cv2  # resize SIMD (SSE/AVX), nhanh hơn hẳn PIL cho per-frame
+except ImportError:
+    cv2 = None
+
+def _probe_video_header(src: str) -> Optional[dict]:
+    """
+    Đọc metadata video từ container header (không decode frame).
+    Thử PyAV trước, rồi ffprobe; trả None nếu cả hai không có.
+    """
+    try:
+        import av
+    except ImportError:
+        av = None
+    if av is not None:
+        with av.open(src) as container:
+            stream = container.streams.video[0]
+            duration = None
+            if stream.duration is not None:
+                duration = float(stream.duration * stream.time_base)
+            elif container.duration is not None:
+                duration = container.duration / av.time_base
+            return {"width": int(stream.codec_context.width),
+                    "height": int(stream.codec_context.height),
+                    "duration": duration}
+
+    if shutil.which("ffprobe"):
+        proc = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0",
+                "-show_entries", "stream=width,height,duration",
+                "-show_entries", "format=duration",
+                "-of", "json", src],
+            capture_output=True, text=True)
+        if proc.returncode == 0:
+            data = json.loads(proc.stdout)
+            stream = data["streams"][0]
+            duration = stream.get("duration") or data.get("format", {}).get("duration")
+            return {"width": int(stream["width"]),
+                    "height": int(stream["height"]),
+                    "duration": float(duration) if duration else None}
+    return None
+
+
+_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "video_gen")
+_probe_db: Optional[sqlite3.Connection] = None
+# build_graphics probe từ pool worker (chunk0-18) -> connection phải dùng
+# được cross-thread: check_same_thread=False + lock quanh mọi cursor use
+_probe_db_lock = threading.Lock()
+
+def _probe_cache_db() -> sqlite3.Connection:
+    """Kết nối singleton tới cache probe trên đĩa (~/.cache/video_gen)."""
+    global _probe_db
+    if _probe_db is None:
+        with _probe_db_lock:
+            if _probe_db is None:
+                os.makedirs(_CACHE_DIR, exist_ok=True)
+                db = sqlite3.connect(
+                    os.path.join(_CACHE_DIR, "probe.sqlite"),
+                    check_same_thread=False,
+                )
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS probe ("
+                    "path TEXT, size INTEGER, mtime INTEGER, "
+                    "kind TEXT, width INTEGER, height INTEGER, "
+                    "has_alpha INTEGER, duration REAL, "
+                    "PRIMARY KEY (path, size, mtime))"
+                )
+                _probe_db = db
+    return _probe_db
+
 
 @lru_cache(maxsize=128)
 def probe_media(src: str) -> dict:
     """
     Trả về thông tin cơ bản của media:
     {kind: 'image'|'video'|'svg', width, height, has_alpha, duration}.
+
+    Kết quả được lưu xuống đĩa theo khoá (abspath, size, mtime_ns) nên
+    lần chạy sau chỉ tốn một stat() + dò sqlite thay vì mở lại file.
     """
+    try:
+        st = os.stat(src)
+        key = (os.path.abspath(src), st.st_size, st.st_mtime_ns)
+    except OSError:
+        return _probe_media_uncached(src)
+
+    db = _probe_cache_db()
+    with _probe_db_lock:
+        row = db.execute(
+            "SELECT kind, width, height, has_alpha, duration FROM probe "
+            "WHERE path=? AND size=? AND mtime=?", key).fetchone()
+    if row:
+        kind, width, height, has_alpha, duration = row
+        return {"kind": kind, "width": width, "height": height,
+                "has_alpha": bool(has_alpha), "duration": duration}
+
+    info = _probe_media_uncached(src)
+    with _probe_db_lock:
+        db.execute(
+            "INSERT OR REPLACE INTO probe VALUES (?,?,?,?,?,?,?,?)",
+            key + (info["kind"], info["width"], info["height"],
+                    int(bool(info["has_alpha"])), info["duration"]))
+        db.commit()
+    return info
+
+
+def _probe_media_uncached(src: str) -> dict:
+    """Probe thật sự (không cache) — xem probe_media."""
     ext = os.path.splitext(src)[1].lower()
     if ext in (".png", ".jpg", ".jpeg", ".webp"):
         im = Image.open(src)
@@ -24,9 +139,15 @@ def probe_media(src: str) -> dict:
         return {"kind": "image", "width": width, "height": height,
                 "has_alpha": has_alpha, "duration": None}
     elif ext in (".mp4", ".mov", ".mkv", ".webm", ".avi"):
-        clip = VideoFileClip(src)
-        return {"kind": "video", "width": clip.w, "height": clip.h,
-                "has_alpha": False, "duration": clip.duration}
+        info = _probe_video_header(src)
+        if info is None:
+            # Không có PyAV/ffprobe: đành mở decoder đầy đủ (chậm hơn nhiều)
+            logging.debug("probe_media: no PyAV/ffprobe, falling back to VideoFileClip")
+            clip = VideoFileClip(src)
+            info = {"width": clip.w, "height": clip.h, "duration": clip.duration}
+            clip.close()
+        return {"kind": "video", "width": info["width"], "height": info["height"],
+                "has_alpha": False, "duration": info["duration"]}
     elif ext == ".svg":
         # SVG sẽ xử lý ở Phase-2
         return {"kind": "svg", "width": None, "height": None,
@@ -35,22 +156,122 @@ def probe_media(src: str) -> dict:
         raise ValueError(f"Unsupported file type: {ext}")
 
 
-@lru_cache(maxsize=64)
-def load_image_clip(src: str) -> ImageClip:
+# Cache mảng RGBA đã decode, giới hạn theo tổng bytes (không phải số entry)
+# để RSS không phình theo số ảnh unique (một PNG 4K ~ 33 MB).
+_RGBA_CACHE_BYTES = 256 * 1024 * 1024
+_rgba_cache = LRUCache(maxsize=_RGBA_CACHE_BYTES, getsizeof=lambda arr: arr.nbytes)
+# cachetools không thread-safe; _build_one chạy từ pool worker nên mọi
+# insert/evict trên LRU phải qua lock
+_rgba_cache_lock = threading.RLock()
+
+# Tier-2: cache mảng đã decode/pre-resize xuống đĩa — rebuild lần sau
+# bỏ qua cả PIL decode lẫn thumbnail/draft. Evict theo tổng dung lượng.
+_RESIZED_CACHE_DIR = os.path.join(_CACHE_DIR, "resized")
+_RESIZED_CACHE_LIMIT = 1 << 30  # 1 GB
+
+def _resized_cache_path(src: str, target_wh: Optional[Tuple[int, int]]) -> Optional[str]:
+    try:
+        st = os.stat(src)
+    except OSError:
+        return None
+    tw, th = target_wh if target_wh else (0, 0)
+    key = hashlib.sha1(
+        f"{os.path.abspath(src)}|{st.st_mtime_ns}|{st.st_size}|{tw}|{th}".encode()
+    ).hexdigest()
+    return os.path.join(_RESIZED_CACHE_DIR, f"{key}.npy")
+
+def _evict_resized_cache(limit: int = _RESIZED_CACHE_LIMIT) -> None:
+    """Xoá entry cũ nhất (mtime) khi tổng dung lượng cache vượt limit."""
+    try:
+        entries = [(e.stat().st_mtime, e.stat().st_size, e.path)
+                    for e in os.scandir(_RESIZED_CACHE_DIR) if e.is_file()]
+    except OSError:
+        return
+    total = sum(size for _, size, _ in entries)
+    if total <= limit:
+        return
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= limit:
+            break
+
+
+@cached(_rgba_cache, lock=_rgba_cache_lock)
+def _load_rgba_array(src: str, target_wh: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """
+    Decode PNG/JPG thành mảng RGBA uint8 (cache theo bytes).
+    Dùng pyvips nếu có (decode tile-streaming, đỡ tốn RAM đỉnh);
+    không thì rơi về Pillow.
+
+    Nếu biết target_wh, chỉ decode tới ~2x kích thước đích (JPEG: DCT
+    draft trong libjpeg, PNG: thumbnail; không bao giờ upscale) thay vì
+    decode full-res rồi vứt pixel khi resize.
+
+    Kết quả còn được lưu .npy dưới ~/.cache/video_gen/resized (khoá theo
+    src + mtime + size + target) để rebuild sau không phải decode lại.
+    """
+    cache_path = _resized_cache_path(src, target_wh)
+    if cache_path and os.path.exists(cache_path):
+        try:
+            return np.load(cache_path)
+        except Exception:
+            pass  # file hỏng -> decode lại và ghi đè
+
+    arr = _decode_rgba(src, target_wh)
+
+    if cache_path:
+        try:
+            os.makedirs(_RESIZED_CACHE_DIR, exist_ok=True)
+            np.save(cache_path, arr)
+            _evict_resized_cache()
+        except OSError:
+            pass
+    return arr
+
+
+def _decode_rgba(src: str, target_wh: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """Decode thật sự (không cache) — xem _load_rgba_array."""
+    if pyvips is not None:
+        if target_wh:
+            im = pyvips.Image.thumbnail(src, 2 * target_wh[0],
+                                        height=2 * target_wh[1], size="down")
+        else:
+            im = pyvips.Image.new_from_file(src, access="sequential")
+        if im.bands < 4:
+            im = im.addalpha()
+        return np.ndarray(buffer=im.write_to_memory(), dtype=np.uint8,
+                            shape=(im.height, im.width, 4))
+    im = Image.open(src)
+    if target_wh:
+        tw, th = target_wh
+        if im.format == "JPEG":
+            # draft phải gọi trước khi load pixel: libjpeg bỏ bớt IDCT
+            im.draft("RGB", (2 * tw, 2 * th))
+        else:
+            im.thumbnail((2 * tw, 2 * th), Image.Resampling.BILINEAR)
+    im = im.convert("RGBA")
+    return np.array(im)  # numpy sẽ dùng cho ImageClip
+
+
+def load_image_clip(src: str, target_wh: Optional[Tuple[int, int]] = None) -> ImageClip:
     """
     Nạp PNG/JPG thành ImageClip (giữ alpha nếu có).
+    Mảng pixel được cache; ImageClip bọc ngoài thì rẻ nên tạo mới mỗi lần.
+    Truyền target_wh (kích thước rect đích) để decode ở độ phân giải thấp hơn.
     """
-    im = Image.open(src).convert("RGBA")
-    arr = np.array(im)  # numpy sẽ dùng cho ImageClip
-    return ImageClip(arr, transparent=True)
+    return ImageClip(_load_rgba_array(src, target_wh), transparent=True)
 
 
 def load_video_clip(src: str) -> VideoFileClip:
     """
-    Nạp video thành VideoFileClip.
+    Nạp video thành VideoFileClip (đăng ký để _lifecycle.close_all dọn).
     Phase-2: sẽ thêm trim/loop ở Wrapper.
     """
-    return VideoFileClip(src)
+    return _lifecycle.register(VideoFileClip(src))
 
 
 def rasterize_svg(src: str, dpi: int = 192) -> ImageClip:
@@ -74,20 +295,92 @@ def compute_rect(src_wh: Tuple[int, int],
     return fit_into_rect(src_wh[0], src_wh[1], dst_rect, mode=mode)
 
 
+def _prebake_static(arr: np.ndarray, w: int, h: int,
+                    opacity: float, rotation: float) -> np.ndarray:
+    """
+    Gộp resize + rotate + opacity của ảnh tĩnh thành một mảng RGBA bake
+    sẵn: một lần O(W·H) lúc build thay vì chuỗi transform MoviePy chạy
+    lại cho từng frame.
+    """
+    arr = np.asarray(arr)
+    if arr.dtype != np.uint8:
+        arr = np.clip(arr, 0, 255).astype(np.uint8)  # ColorClip giữ img ở int
+    im = Image.fromarray(arr)
+    if im.mode != "RGBA":
+        im = im.convert("RGBA")
+    if (im.width, im.height) != (w, h):
+        im = im.resize((w, h), Image.LANCZOS)
+    if rotation:
+        im = im.rotate(rotation, expand=True)
+    out = np.array(im)
+    if opacity < 1.0:
+        alpha = out[..., 3].astype(np.float32) * opacity
+        out[..., 3] = np.clip(alpha, 0, 255).astype(np.uint8)
+    return out
+
+
+def _cv_resize(clip: VideoClip, new_size: Tuple[int, int]) -> VideoClip:
+    """
+    Resize per-frame bằng cv2 thay cho clip.resized (PIL):
+    INTER_AREA khi thu nhỏ, INTER_LANCZOS4 khi phóng to.
+    Áp cho cả mask (frame float [0,1] — cv2 xử lý được).
+    """
+    nw, nh = int(new_size[0]), int(new_size[1])
+
+    def fl(frame):
+        if frame.dtype != np.uint8 and frame.dtype != np.float32:
+            # cv2 không nhận int64 (ColorClip) / float64 (mask)
+            frame = frame.astype(np.float32 if frame.dtype.kind == "f" else np.uint8)
+        interp = cv2.INTER_AREA if nw < frame.shape[1] else cv2.INTER_LANCZOS4
+        return cv2.resize(frame, (nw, nh), interpolation=interp)
+
+    resized = clip.image_transform(fl, apply_to=["mask"])
+    resized.size = (nw, nh)  # image_transform không tự cập nhật size
+    if resized.mask is not None:
+        resized.mask.size = (nw, nh)
+    return resized
+
+
 def position_clip(clip: VideoClip,
                     rect: Rect,
                     opacity: float = 1.0,
                     rotation: float = 0.0) -> VideoClip:
     """
     Resize/crop clip nếu cần, set vị trí (x,y), opacity, rotation.
+    Với ảnh tĩnh (ImageClip/ColorClip), toàn bộ transform được bake một
+    lần vào mảng pixel thay vì xếp chồng wrapper per-frame.
     """
     x, y, w, h = rect
-    clip = clip.resized((w, h))
+
+    if isinstance(clip, ImageClip) and getattr(clip, "img", None) is not None:
+        arr = clip.img
+        if clip.mask is not None and getattr(clip.mask, "img", None) is not None:
+            alpha = np.clip(clip.mask.img * 255.0, 0, 255).astype(np.uint8)
+            arr = np.dstack([arr[..., :3], alpha])
+        prebaked = _prebake_static(arr, w, h, opacity, rotation)
+        baked = ImageClip(prebaked, transparent=True)
+        if clip.duration:
+            baked = baked.with_duration(clip.duration)
+        if (x, y) != (0, 0):  # (0,0) là position mặc định của moviepy
+            baked = baked.with_position((x, y))
+        # metadata cho occlusion cull của compose_scene
+        baked._vg_rect = (x, y, prebaked.shape[1], prebaked.shape[0])
+        baked._vg_opaque = bool(prebaked[..., 3].min() == 255)
+        return baked
+
+    # chỉ chồng wrapper khi transform khác identity — mỗi wrapper là thêm
+    # một tầng gọi Python per-frame trong get_frame
+    if (w, h) != (clip.w, clip.h):
+        clip = _cv_resize(clip, (w, h)) if cv2 is not None else clip.resized((w, h))
     if rotation:
         clip = clip.rotated(rotation)
     if opacity < 1.0:
         clip = clip.with_opacity(opacity)
-    return clip.with_position((x, y))
+    if (x, y) != (0, 0):
+        clip = clip.with_position((x, y))
+    clip._vg_rect = (x, y, clip.w, clip.h)
+    clip._vg_opaque = bool(opacity >= 1.0 and not rotation and clip.mask is None)
+    return clip
 
 
 def warn_if_upscale_core(src_wh: Tuple[int, int],
@@ -98,6 +391,23 @@ def warn_if_upscale_core(src_wh: Tuple[int, int],
     """
     warn_if_upscale(src_wh, dst_rect, limit=limit)
 
+# Policy & validation theo role "biên dịch sẵn" thành bảng module-level:
+# mỗi call chỉ còn dict lookup thay vì chuỗi if/elif + dựng string mới.
+# (Giữ GraphicSpec là dataclass — schema public của repo.)
+_VALID_ROLES = frozenset(("background", "illustration", "overlay", "special"))
+
+# role -> (default_mode, snap_safe override hoặc None = giữ nguyên)
+_ROLE_POLICY = {
+    "background": ("cover", False),
+    "overlay": ("fit", True),
+}
+_DEFAULT_POLICY = ("fit", None)  # illustration / special
+
+_SRC_ERR = {
+    "background": "background needs either src (image) or color",
+}
+_SRC_ERR_DEFAULT = "non-background needs src or color (shape overlay)"
+
 def apply_policies(spec: GraphicSpec, meta: Meta) -> GraphicSpec:
     """
     Điền default & ép rule theo role:
@@ -109,34 +419,39 @@ def apply_policies(spec: GraphicSpec, meta: Meta) -> GraphicSpec:
         raise ValueError("GraphicSpec.layout is required")
 
     ly = spec.layout
-
-    if spec.role == "background":
-        if ly.mode not in ("fit", "cover"): ly.mode = "cover"
-        ly.snap_safe = False
-    elif spec.role == "overlay":
-        ly.snap_safe = True
-        if ly.mode not in ("fit", "cover"): ly.mode = "fit"
-    else:  # illustration / special
-        if ly.mode not in ("fit", "cover"): ly.mode = "fit"
+    default_mode, snap_override = _ROLE_POLICY.get(spec.role, _DEFAULT_POLICY)
+    if ly.mode not in ("fit", "cover"):
+        ly.mode = default_mode
+    if snap_override is not None:
+        ly.snap_safe = snap_override
 
     spec.layout = ly
     return spec
 
+def prepare_graphic_specs(specs: List[GraphicSpec], meta: Meta) -> List[GraphicSpec]:
+    """
+    Chạy apply_policies + validate_graphic_spec MỘT lần cho cả danh sách
+    (thay vì lặp lại trong từng build_*). Lỗi được gom theo index và raise
+    một lần; specs hợp lệ sau đó dispatch với skip_validation=True.
+    """
+    specs = [apply_policies(s, meta) for s in specs]
+    all_errs = {i: e for i, e in
+                ((i, validate_graphic_spec(s, meta)) for i, s in enumerate(specs)) if e}
+    if all_errs:
+        raise ValueError(f"Invalid graphic specs: {all_errs}")
+    return specs
+
 def validate_graphic_spec(spec: GraphicSpec, meta: Meta) -> List[str]:
     """
     Validate nhẹ ở wrapper: role/src/color/layout rect.
     Trả về danh sách lỗi dạng string (đủ cho MVP).
     """
     errors: List[str] = []
-    if spec.role not in ("background", "illustration", "overlay", "special"):
+    if spec.role not in _VALID_ROLES:
         errors.append("role invalid")
 
-    if spec.role == "background":
-        if not spec.src and not spec.color:
-            errors.append("background needs either src (image) or color")
-    else:
-        if not spec.src and not spec.color:
-            errors.append("non-background needs src or color (shape overlay)")
+    if not spec.src and not spec.color:
+        errors.append(_SRC_ERR.get(spec.role, _SRC_ERR_DEFAULT))
 
     if spec.layout is None:
         errors.append("layout missing")
@@ -1,15 +1,20 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Tuple
 import logging
+import os
 
 from moviepy import CompositeVideoClip,VideoClip, ColorClip
 
 from tools.schema.dataclass import Meta, GraphicSpec, Layout, Rect
-from tools.geometry.core import snap_to_safe
+from tools.geometry.core import (
+    snap_to_safe, batch_snap_and_fit, pack_rects, unpack_rects,
+    MODE_FIT, MODE_COVER,
+)
 from .core import (
     probe_media, load_image_clip, compute_rect,
-    position_clip, warn_if_upscale_core, make_solid_background,
-    apply_policies, validate_graphic_spec
+    position_clip, warn_if_upscale_core,
+    apply_policies, validate_graphic_spec, prepare_graphic_specs
 )
 from utils import convert_color
 
@@ -23,18 +28,25 @@ def build_solid_background(color: str|tuple,
     Tạo nền màu đặc với size và duration.
     """
     try:
-        return ColorClip(size, color=color).with_duration(duration)
+        clip = ColorClip(size, color=color).with_duration(duration)
     except Exception:
         color:tuple = convert_color(color)["rgb"]
-        return ColorClip(size, color=color).with_duration(duration)
-def build_background(spec: GraphicSpec, meta: Meta, scene_duration: float) -> VideoClip:
+        clip = ColorClip(size, color=color).with_duration(duration)
+    # màu đặc phủ kín size của nó -> dùng được cho occlusion cull
+    clip._vg_rect = (0, 0, size[0], size[1])
+    clip._vg_opaque = True
+    return clip
+def build_background(spec: GraphicSpec, meta: Meta, scene_duration: float,
+                        skip_validation: bool = False) -> VideoClip:
     """
     Nền màu hoặc ảnh (cover).
+    skip_validation: spec đã qua prepare_graphic_specs -> bỏ prologue.
     """
-    spec = apply_policies(spec, meta)
-    errs = validate_graphic_spec(spec, meta)
-    if errs:
-        raise ValueError(f"Invalid background spec: {errs}")
+    if not skip_validation:
+        spec = apply_policies(spec, meta)
+        errs = validate_graphic_spec(spec, meta)
+        if errs:
+            raise ValueError(f"Invalid background spec: {errs}")
 
     ly = spec.layout
     assert ly is not None
@@ -42,27 +54,30 @@ def build_background(spec: GraphicSpec, meta: Meta, scene_duration: float) -> Vi
 
     if spec.color and not spec.src:
         # màu đặc
-        return make_solid_background(spec.color, (meta.width, meta.height), scene_duration)
+        return build_solid_background(spec.color, (meta.width, meta.height), scene_duration)
 
     # ảnh nền
     info = probe_media(spec.src)
     if info["kind"] != "image":
         raise ValueError(f"Background only supports images in MVP, got {info['kind']}")
 
-    clip = load_image_clip(spec.src)
     placed = compute_rect((info["width"], info["height"]), rect, mode=ly.mode or "cover")
     warn_if_upscale_core((info["width"], info["height"]), placed, limit=1.5)
     placed = _maybe_snap(placed, spec, meta)
+    clip = load_image_clip(spec.src, target_wh=(placed[2], placed[3]))
     return position_clip(clip, placed, opacity=ly.opacity, rotation=ly.rotation).with_duration(scene_duration)
 
-def build_illustration(spec: GraphicSpec, meta: Meta, scene_duration: float) -> VideoClip:
+def build_illustration(spec: GraphicSpec, meta: Meta, scene_duration: float,
+                        skip_validation: bool = False) -> VideoClip:
     """
     Ảnh minh họa PNG/JPG (fit|cover), snap safe.
+    skip_validation: spec đã qua prepare_graphic_specs -> bỏ prologue.
     """
-    spec = apply_policies(spec, meta)
-    errs = validate_graphic_spec(spec, meta)
-    if errs:
-        raise ValueError(f"Invalid illustration spec: {errs}")
+    if not skip_validation:
+        spec = apply_policies(spec, meta)
+        errs = validate_graphic_spec(spec, meta)
+        if errs:
+            raise ValueError(f"Invalid illustration spec: {errs}")
 
     ly = spec.layout
     assert ly is not None
@@ -70,44 +85,126 @@ def build_illustration(spec: GraphicSpec, meta: Meta, scene_duration: float) ->
 
     if spec.color and not spec.src:
         # shape đơn sắc (overlay dạng hình chữ nhật)
-        shape = make_solid_background(spec.color, (rect[2], rect[3]), scene_duration)
+        shape = build_solid_background(spec.color, (rect[2], rect[3]), scene_duration)
         return position_clip(shape, (rect[0], rect[1], rect[2], rect[3]), opacity=ly.opacity, rotation=ly.rotation)
 
     info = probe_media(spec.src)
     if info["kind"] != "image":
         raise ValueError(f"Illustration supports images only in MVP, got {info['kind']}")
 
-    clip = load_image_clip(spec.src)
     placed = compute_rect((info["width"], info["height"]), rect, mode=ly.mode)
     warn_if_upscale_core((info["width"], info["height"]), placed, limit=1.5)
+    clip = load_image_clip(spec.src, target_wh=(placed[2], placed[3]))
     return position_clip(clip, placed, opacity=ly.opacity, rotation=ly.rotation).with_duration(scene_duration)
 
-def build_overlay(spec: GraphicSpec, meta: Meta, scene_duration: float) -> VideoClip:
+def build_overlay(spec: GraphicSpec, meta: Meta, scene_duration: float,
+                    skip_validation: bool = False) -> VideoClip:
     """
     Logo/Watermark, ép snap_safe & z cao.
+    skip_validation: spec đã qua prepare_graphic_specs -> bỏ prologue.
     """
-    spec = apply_policies(spec, meta)
-    errs = validate_graphic_spec(spec, meta)
-    if errs:
-        raise ValueError(f"Invalid overlay spec: {errs}")
+    if not skip_validation:
+        spec = apply_policies(spec, meta)
+        errs = validate_graphic_spec(spec, meta)
+        if errs:
+            raise ValueError(f"Invalid overlay spec: {errs}")
 
     ly = spec.layout
     assert ly is not None
     rect = _maybe_snap(ly.rect, spec, meta)
 
     if spec.color and not spec.src:
-        shape = make_solid_background(spec.color, (rect[2], rect[3]), scene_duration)
+        shape = build_solid_background(spec.color, (rect[2], rect[3]), scene_duration)
         return position_clip(shape, (rect[0], rect[1], rect[2], rect[3]), opacity=ly.opacity, rotation=ly.rotation)
 
     info = probe_media(spec.src)
     if info["kind"] != "image":
         raise ValueError(f"Overlay supports images only in MVP, got {info['kind']}")
 
-    clip = load_image_clip(spec.src)
     placed = compute_rect((info["width"], info["height"]), rect, mode=ly.mode)
     warn_if_upscale_core((info["width"], info["height"]), placed, limit=1.5)
+    clip = load_image_clip(spec.src, target_wh=(placed[2], placed[3]))
     return position_clip(clip, placed, opacity=ly.opacity, rotation=ly.rotation).with_duration(scene_duration)
 
+def _build_jobs(n: int) -> int:
+    """Số worker cho build_graphics: env VIDEO_GEN_JOBS hoặc min(8, n)."""
+    env = os.environ.get("VIDEO_GEN_JOBS")
+    if env:
+        return max(1, int(env))
+    return min(8, n)
+
+def build_graphics(specs: List[GraphicSpec], meta: Meta, scene_duration: float) -> dict:
+    """
+    Build toàn bộ graphics của một scene theo batch: geometry (snap + fit)
+    được tính một lần bằng batch_snap_and_fit thay vì gọi lẻ từng spec.
+
+    Returns:
+        dict {"background": clip|None, "illustrations": [...], "overlays": [...]},
+        giữ nguyên thứ tự đầu vào trong từng nhóm.
+    """
+    specs = prepare_graphic_specs(specs, meta)
+    if not specs:
+        # build_scene chấp nhận graphics=[] — trả các nhóm rỗng luôn
+        return {"background": None, "illustrations": [], "overlays": []}
+
+    jobs = _build_jobs(len(specs))
+    pool = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        # probe (PIL open / ffprobe) là I/O-bound và nhả GIL -> chạy song song
+        if pool is not None:
+            infos = list(pool.map(
+                lambda s: probe_media(s.src) if s.src else None, specs))
+        else:
+            infos = [probe_media(s.src) if s.src else None for s in specs]
+
+        rects, src_whs, modes, snap_mask = [], [], [], []
+        for s, info in zip(specs, infos):
+            ly = s.layout
+            rects.append(tuple(ly.rect))
+            if info is not None:
+                if info["kind"] != "image":
+                    raise ValueError(f"{s.role} supports images only in MVP, got {info['kind']}")
+                src_whs.append((info["width"], info["height"]))
+            else:
+                # shape màu: nguồn trùng rect đích -> fit là no-op
+                src_whs.append((ly.rect[2], ly.rect[3]))
+            modes.append(MODE_COVER if ly.mode == "cover" else MODE_FIT)
+            snap_mask.append(bool(ly.snap_safe))
+
+        placed = batch_snap_and_fit(pack_rects(rects), src_whs, modes, meta, snap_mask)
+
+        def _build_one(args) -> VideoClip:
+            s, info, rect = args
+            ly = s.layout
+            if s.color and not s.src:
+                if s.role == "background":
+                    return build_solid_background(s.color, (meta.width, meta.height), scene_duration)
+                shape = build_solid_background(s.color, (rect.w, rect.h), scene_duration)
+                return position_clip(shape, rect, opacity=ly.opacity, rotation=ly.rotation)
+            warn_if_upscale_core((info["width"], info["height"]), rect, limit=1.5)
+            return position_clip(load_image_clip(s.src, target_wh=(rect.w, rect.h)), rect,
+                                    opacity=ly.opacity, rotation=ly.rotation
+                                    ).with_duration(scene_duration)
+
+        triples = list(zip(specs, infos, unpack_rects(placed)))
+        if pool is not None:
+            clips = list(pool.map(_build_one, triples))  # map giữ thứ tự -> z-order ổn định
+        else:
+            clips = [_build_one(t) for t in triples]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    out = {"background": None, "illustrations": [], "overlays": []}
+    for s, clip in zip(specs, clips):
+        if s.role == "background":
+            out["background"] = clip
+        elif s.role == "overlay":
+            out["overlays"].append(clip)
+        else:  # illustration / special
+            out["illustrations"].append(clip)
+    return out
+
 def build_special(spec: GraphicSpec, meta: Meta, scene_duration: float) -> Optional[VideoClip]:
     """
     Placeholder: SVG/video alpha… chưa hỗ trợ ở MVP.
@@ -119,6 +216,31 @@ def build_special(spec: GraphicSpec, meta: Meta, scene_duration: float) -> Optio
 # Compose
 # =========================
 
+def _rect_contains(outer: Tuple[int, int, int, int],
+                    inner: Tuple[int, int, int, int]) -> bool:
+    ox, oy, ow, oh = outer
+    ix, iy, iw, ih = inner
+    return ox <= ix and oy <= iy and ox + ow >= ix + iw and oy + oh >= iy + ih
+
+def _cull_occluded(layers: List[VideoClip]) -> List[VideoClip]:
+    """
+    Painter's-algorithm cull: bỏ layer bị một layer đục (opacity=1,
+    không mask) phía trên che phủ hoàn toàn — get_frame của nó sẽ không
+    bao giờ nhìn thấy. Chỉ xét layer có metadata _vg_rect/_vg_opaque
+    (được position_clip/build_solid_background gắn).
+    """
+    kept: List[VideoClip] = []
+    covered: List[Tuple[int, int, int, int]] = []
+    for layer in reversed(layers):
+        rect = getattr(layer, "_vg_rect", None)
+        if rect is not None and any(_rect_contains(c, rect) for c in covered):
+            continue
+        kept.append(layer)
+        if rect is not None and getattr(layer, "_vg_opaque", False):
+            covered.append(rect)
+    kept.reverse()
+    return kept
+
 def compose_scene(bg: VideoClip,
                 illustrations: list[VideoClip],
                 presenter: Optional[VideoClip],
@@ -126,10 +248,13 @@ def compose_scene(bg: VideoClip,
                 canvas_size: Tuple[int, int]) -> CompositeVideoClip:
     """
     Ghép theo thứ tự: background → illustrations → presenter → overlays.
+    Layer bị che hoàn toàn bởi layer đục phía trên sẽ bị loại trước khi
+    composite (không tốn get_frame per-frame cho thứ không nhìn thấy).
     """
     layers: List[VideoClip] = []
     if bg: layers.append(bg)
     layers.extend(illustrations or [])
     if presenter: layers.append(presenter)
     layers.extend(overlays or [])
+    layers = _cull_occluded(layers)
     return CompositeVideoClip(layers, size=canvas_size) #FIXME: compose không thuộc quản lý của graphics -> Move to Timeline
\ No newline at end of file
@@ -1,9 +1,19 @@
+import os
+from functools import lru_cache
 from typing import Tuple
-from moviepy import VideoClip, VideoFileClip, ColorClip, CompositeVideoClip
+from moviepy import VideoClip, ColorClip, CompositeVideoClip
 from tools.schema.dataclass import Rect
-from .core import _square_center_crop, _circle_mask, remove_green_background
+from .core import _open_video, _square_center_crop, _circle_mask, remove_green_background
 from utils import top_colors_first_frame
 
+@lru_cache(maxsize=32)
+def _auto_chroma(src: str, mtime_ns: int) -> Tuple[int, int, int]:
+    """
+    Màu nền chiếm ưu thế ở frame đầu của src — cache theo (src, mtime)
+    để không decode + histogram lại khi cùng presenter dùng ở nhiều scene.
+    """
+    return tuple(top_colors_first_frame(_open_video(src))[0]["rgb"])
+
 def build_avatar(src: str, 
                 rect: Rect, 
                 canvas_size=(1920,1080),
@@ -20,12 +30,12 @@ def build_avatar(src: str,
     x, y, w, h = rect
     D = int(min(w, h))
 
-    base = VideoFileClip(src)
+    base = _open_video(src)
     dur  = base.duration
 
-    if chroma_color: 
+    if chroma_color:
         if chroma_color == "auto":
-            chroma_color = top_colors_first_frame(base)[0]["rgb"]    
+            chroma_color = _auto_chroma(src, os.stat(src).st_mtime_ns)
         base = remove_green_background(base, chroma_color=chroma_color)
     # 1) crop vuông + resize về D×D
     sq   = _square_center_crop(base, face_bias=face_bias).resized((D, D))
@@ -55,7 +65,7 @@ def build_circle_avatar(src: str, rect: Rect, canvas_size=(1920,1080),
     x, y, w, h = rect
     D = int(min(w, h))
 
-    base = VideoFileClip(src)
+    base = _open_video(src)
     dur  = base.duration
 
     # 1) crop vuông + resize về D×D
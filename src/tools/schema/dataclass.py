@@ -21,6 +21,13 @@ class Fonts:
     sans: Optional[str] = None  # Path to a sans-serif font (.ttf/.otf). None uses Pillow's default.
     mono: Optional[str] = None  # Path to a monospace font (.ttf/.otf). None uses Pillow's default.
 
+    @classmethod
+    def _from_dict(cls, d: Optional[dict]) -> "Fonts":
+        """Dựng từ dict spec bằng positional args (đường nóng normalize)."""
+        if d is None:
+            return cls()
+        return cls(d.get("sans"), d.get("mono"))
+
 @dataclass
 class Style:
     """
@@ -32,9 +39,23 @@ class Style:
     opacity: float = 1.0                     # Opacity (0–1)
     pad: int = 0                             # Padding for background (e.g., captions)
     interline: int = 4                       # Line spacing between wrapped lines
-    baseline_pad_pct: float = 0.32           # Extra bottom padding ratio to avoid descender clipping
+    baseline_pad_pct: Optional[float] = 0.32 # Extra bottom padding ratio to avoid descender clipping (None = auto per font)
     top_pad_pct: float = 0.10                # Extra top padding ratio for symmetry
 
+    @classmethod
+    def _from_dict(cls, d: Optional[dict]) -> "Style":
+        """
+        Dựng từ dict spec với default của pipeline normalize — gọi
+        positional một lượt thay vì resolve từng keyword.
+        """
+        if d is None:
+            return cls()
+        g = d.get
+        return cls(g("color", "#ffffff"), g("stroke_color", "#000000"),
+                   g("stroke_width", 0), g("opacity", 1.0), g("pad", 0),
+                   g("underline", 4), g("baseline_pad_pct", 0.32),
+                   g("top_pad_pct", 0.1))
+
 
 @dataclass(frozen=True)
 class Meta:
@@ -116,6 +137,13 @@ class Layout:
     opacity: float = 1.0
     snap_safe: bool = True
 
+    @classmethod
+    def _from_dict(cls, d: dict) -> "Layout":
+        """Dựng từ dict spec bằng positional args (rect đã validate)."""
+        g = d.get
+        return cls(Rect(*d["rect"]), g("mode", "fit"), g("align", "center"),
+                   g("rotation", 0.0), g("opacity", 1.0), g("snap_safe", True))
+
 @dataclass
 class GraphicSpec:
     role: Literal["background", "illustration", "overlay", "special"]
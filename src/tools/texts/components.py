@@ -1,44 +1,60 @@
 """ High-level text UI components and wrappers. """
-from tools.schema.dataclass import Payload
+from functools import partial
 from .core import render_text_element
 from .layout import wrapped_text_clip, structured_multiline_clip
-from typing import Any, Dict
-from moviepy import VideoClip
-from typing import List, Callable
 
-def title_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("course_title", payload, spec, **kw)
-def subtitle_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("subtitle", payload, spec, **kw)
-def lowerthird_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("lowerthird_name", payload, spec, **kw)
-def section_marker_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("section_marker", payload, spec, **kw)
-def heading_h1_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("heading_h1", payload, spec, **kw)
-def heading_h2_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("heading_h2", payload, spec, **kw)
-def heading_h3_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("heading_h3", payload, spec, **kw)
-def body_bullet_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("body_bullet", payload, spec, **kw)
-def definition_term_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("definition_term", payload, spec, **kw)
-def step_label_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("step_label", payload, spec, **kw)
-def code_snippet_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("code_snippet", payload, spec, **kw)
-def equation_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("equation", payload, spec, **kw)
-def chart_labels_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("chart_labels", payload, spec, **kw)
-def data_labels_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("data_labels", payload, spec, **kw)
-def captions_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("captions", payload, spec, **kw)
-def speaker_label_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("speaker_label", payload, spec, **kw)
-def quiz_question_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("quiz_question", payload, spec, **kw)
-def quiz_choices_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("quiz_choices", payload, spec, **kw)
-def quiz_feedback_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("quiz_feedback", payload, spec, **kw)
-def cta_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("cta", payload, spec, **kw)
-def progress_ui_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("progress_ui", payload, spec, **kw)
-def timestamp_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("timestamp", payload, spec, **kw)
-def legal_credits_clip(payload: Payload, spec: Dict[str, Any], **kw) -> VideoClip: return render_text_element("legal_credits", payload, spec, **kw)
+# Mỗi wrapper chỉ là render_text_element đã bind sẵn element_id ->
+# partial: không tốn frame setup per call, thêm element type mới chỉ là
+# thêm một dòng data.
+_ELEMENT_IDS = {
+    "title_clip": "course_title",
+    "subtitle_clip": "subtitle",
+    "lowerthird_clip": "lowerthird_name",
+    "section_marker_clip": "section_marker",
+    "heading_h1_clip": "heading_h1",
+    "heading_h2_clip": "heading_h2",
+    "heading_h3_clip": "heading_h3",
+    "body_bullet_clip": "body_bullet",
+    "definition_term_clip": "definition_term",
+    "step_label_clip": "step_label",
+    "code_snippet_clip": "code_snippet",
+    "equation_clip": "equation",
+    "chart_labels_clip": "chart_labels",
+    "data_labels_clip": "data_labels",
+    "captions_clip": "captions",
+    "speaker_label_clip": "speaker_label",
+    "quiz_question_clip": "quiz_question",
+    "quiz_choices_clip": "quiz_choices",
+    "quiz_feedback_clip": "quiz_feedback",
+    "cta_clip": "cta",
+    "progress_ui_clip": "progress_ui",
+    "timestamp_clip": "timestamp",
+    "legal_credits_clip": "legal_credits",
+}
 
-def title_wrap(text, spec, **kw):           return wrapped_text_clip("course_title", text, spec, **kw)
-def subtitle_wrap(text, spec, **kw):        return wrapped_text_clip("subtitle", text, spec, **kw)
-def definition_wrap(text, spec, **kw):      return wrapped_text_clip("definition_term", text, spec, **kw)
-def eq_wrap(text, spec, **kw):              return wrapped_text_clip("equation", text, spec, **kw)
-def caption_wrap(text, spec, **kw):         return wrapped_text_clip("captions", text, spec, **kw)
-def h1_wrap(text, spec, **kw):              return wrapped_text_clip("heading_h1", text, spec, **kw)
-def h2_wrap(text, spec, **kw):              return wrapped_text_clip("heading_h2", text, spec, **kw)
-def h3_wrap(text, spec, **kw):              return wrapped_text_clip("heading_h3", text, spec, **kw)
+_WRAP_IDS = {
+    "title_wrap": "course_title",
+    "subtitle_wrap": "subtitle",
+    "definition_wrap": "definition_term",
+    "eq_wrap": "equation",
+    "caption_wrap": "captions",
+    "h1_wrap": "heading_h1",
+    "h2_wrap": "heading_h2",
+    "h3_wrap": "heading_h3",
+}
 
 # Structured: dùng cho Bullets/Quiz choices… hiển thị so-le
-def bullets_staggered_clip(items, spec, **kw):      return structured_multiline_clip("body_bullet", items, spec, **kw)
-def quiz_choices_staggered_clip(items, spec, **kw): return structured_multiline_clip("quiz_choices", items, spec, **kw)
\ No newline at end of file
+_STAGGERED_IDS = {
+    "bullets_staggered_clip": "body_bullet",
+    "quiz_choices_staggered_clip": "quiz_choices",
+}
+
+for _name, _eid in _ELEMENT_IDS.items():
+    globals()[_name] = partial(render_text_element, _eid)
+for _name, _eid in _WRAP_IDS.items():
+    globals()[_name] = partial(wrapped_text_clip, _eid)
+for _name, _eid in _STAGGERED_IDS.items():
+    globals()[_name] = partial(structured_multiline_clip, _eid)
+del _name, _eid
+
+__all__ = [*_ELEMENT_IDS, *_WRAP_IDS, *_STAGGERED_IDS]
@@ -3,22 +3,40 @@
 import os
 import math
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
-import numpy as np
+from PIL import Image, ImageDraw
 from moviepy import ImageClip
 from fontTools.ttLib import TTFont
 from moviepy import TextClip
-from math import ceil
 from typing import Any, Dict, Optional
-from moviepy import VideoClip, CompositeVideoClip, ColorClip
+from moviepy import VideoClip, CompositeVideoClip
 from tools.schema.dataclass import Rect, Payload, Fonts, Style
 from .layout import (
-    _mk_text_clip, 
+    _mk_text_clip,
     _pad_transparent,
-    _fit_into_rect, 
-    _place_in_rect, 
-    _caption_bg
+    _fit_into_rect,
+    _place_in_rect,
+    _caption_bg,
+    _compute_pads,
+    _debug_box,
+    _load_font,
+    _compile_spec,
+    _V_ALIGN
 )
+from functools import lru_cache
+# ----
+
+@lru_cache(maxsize=128)
+def _font_metrics(font_path: str) -> tuple:
+    """
+    (upm, descent, ascent) của một font — parse bảng TTF một lần duy nhất
+    thay vì mở lại file cho mỗi lần gọi suggest_baseline_pad_pct.
+    """
+    tt_font = TTFont(os.path.realpath(font_path))
+    upm = tt_font["head"].unitsPerEm
+    descent = abs(tt_font["hhea"].descent)
+    ascent = tt_font["hhea"].ascent
+    return (upm, descent, ascent)
+
 # ----
 
 def suggest_baseline_pad_pct(font_path: str, fudge: float = 0.06) -> float:
@@ -41,9 +59,7 @@ def suggest_baseline_pad_pct(font_path: str, fudge: float = 0.06) -> float:
         >>> suggest_baseline_pad_pct("Inter-Regular.ttf")
         0.30
     """
-    tt_font = TTFont(font_path)
-    upm = tt_font["head"].unitsPerEm
-    descent = abs(tt_font["hhea"].descent)
+    upm, descent, _ = _font_metrics(font_path)
     return (descent / upm) + fudge
 
 # ----
@@ -78,7 +94,7 @@ def oversized_text_clip(
     Returns:
         ImageClip: A MoviePy ImageClip object containing the rendered text.
     """
-    font = ImageFont.truetype(font_path, font_size)
+    font = _load_font(font_path, font_size)
     _, descent = font.getmetrics()
     text_width, text_height = font.getmask(text).size
 
@@ -91,7 +107,8 @@ def oversized_text_clip(
     draw = ImageDraw.Draw(img)
     draw.text((0, 0), text, font=font, fill=color)
 
-    return ImageClip(np.array(img))
+    # np.asarray: view zero-copy trên buffer của PIL thay vì memcpy cả canvas
+    return ImageClip(np.asarray(img))
 
 # ----
 
@@ -162,34 +179,26 @@ def render_text_element(
     fonts = fonts or Fonts()
     style = style or Style()
 
-    # Find element type definition
-    element_type = next(x for x in spec["types"] if x["id"] == element_id)
-    layout_variant = "alternate" if variant == "alternate" else "primary"
-    layout = element_type["layout"][layout_variant]
-
-    rect: Rect = tuple(layout["rect"])
-    h_align: str = layout.get("align", "left")
-    px = int(element_type["size"]["common"])
+    # Find element type definition (compiled once per spec)
+    et = _compile_spec(spec)[element_id]
+    rect: Rect = et.rect(variant)
+    h_align: str = et.align(variant)
+    px = et.px
 
     # Create or fit the base clip
     if isinstance(payload, str):
-        is_mono = bool(element_type["size"].get("mono"))
-        font_path = fonts.mono if is_mono else fonts.sans
-        base: VideoClip = _mk_text_clip(payload, rect, font_path, px, h_align, style)
+        font_path = fonts.mono if et.mono else fonts.sans
+        # pad=False: tầng padding duy nhất là _pad_transparent ngay dưới
+        base: VideoClip = _mk_text_clip(payload, rect, font_path, px, h_align, style,
+                                        pad=False)
 
-        pad_top = int(max(2, ceil(px * style.top_pad_pct)))
-        pad_bottom = int(max(4, ceil(px * style.baseline_pad_pct)))
+        pad_top, pad_bottom = _compute_pads(px, style, font_path)
         clip: VideoClip = _pad_transparent(base, 0, pad_top, 0, pad_bottom)
     else:
         clip = _fit_into_rect(payload, rect)
 
     # Determine vertical alignment
-    if element_id in {"section_marker", "equation", "quiz_question", "quiz_feedback", "cta"}:
-        v_align = "center"
-    elif element_id == "captions":
-        v_align = "bottom"
-    else:
-        v_align = "top"
+    v_align = _V_ALIGN.get(element_id, "top")
 
     # Add caption background if needed
     if element_id == "captions" and isinstance(payload, str):
@@ -208,8 +217,7 @@ def render_text_element(
     if debug_rect:
         x, y, w, h = rect
         box = (
-            ColorClip((w, h), color=(255, 255, 255))
-            .with_opacity(0.15)
+            _debug_box(w, h, 0.15)
             .with_duration(clip.duration or duration)
             .with_position((x, y))
         )
@@ -0,0 +1,108 @@
+""" Raster nhanh cho label khối lượng lớn (captions/subtitles):
+glyph được raster sẵn một lần per (font, px), sau đó composite bằng
+kernel numba thay vì đi qua đường vẽ per-glyph của Pillow. """
+
+import string
+from typing import Optional, Tuple
+import numpy as np
+from PIL import Image, ImageDraw
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:  # numba là optional — rơi về pure Python
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        def wrap(fn):
+            return fn
+        return wrap
+
+# bảng chữ đóng: ASCII in được + dấu tiếng Việt thường gặp
+_VI_EXTRAS = ("àáảãạăằắẳẵặâầấẩẫậđèéẻẽẹêềếểễệìíỉĩị"
+                "òóỏõọôồốổỗộơờớởỡợùúủũụưừứửữựỳýỷỹỵ")
+_CHARSET = string.printable + _VI_EXTRAS + _VI_EXTRAS.upper()
+
+# (font) -> {ch: (alpha_tile uint8, advance int)}
+_glyph_tables: dict = {}
+
+def _glyph_table(font) -> dict:
+    table = _glyph_tables.get(font)
+    if table is None:
+        ascent, descent = font.getmetrics()
+        gh = ascent + descent
+        table = {}
+        for ch in _CHARSET:
+            adv = int(round(font.getlength(ch)))
+            gw = max(1, adv)
+            im = Image.new("L", (gw, gh), 0)
+            ImageDraw.Draw(im).text((0, 0), ch, font=font, fill=255)
+            table[ch] = (np.asarray(im), adv)
+        _glyph_tables[font] = table
+    return table
+
+
+@njit(parallel=True, cache=True)
+def _blit_glyph(out: np.ndarray, tile: np.ndarray, x: int, y: int,
+                r: int, g: int, b: int) -> None:
+    """Composite alpha-over một tile glyph vào canvas RGBA uint8."""
+    h, w = tile.shape
+    H, W = out.shape[0], out.shape[1]
+    for i in prange(h):
+        oy = y + i
+        if oy < 0 or oy >= H:
+            continue
+        for j in range(w):
+            a = tile[i, j]
+            if a == 0:
+                continue
+            ox = x + j
+            if ox < 0 or ox >= W:
+                continue
+            af = a / 255.0
+            inv = 1.0 - af
+            out[oy, ox, 0] = np.uint8(r * af + out[oy, ox, 0] * inv)
+            out[oy, ox, 1] = np.uint8(g * af + out[oy, ox, 1] * inv)
+            out[oy, ox, 2] = np.uint8(b * af + out[oy, ox, 2] * inv)
+            oa = out[oy, ox, 3]
+            out[oy, ox, 3] = a if a > oa else oa
+
+
+def render_line(text: str, font, color: Tuple[int, int, int],
+                out: np.ndarray, x: int, y: int) -> bool:
+    """
+    Vẽ một dòng text vào canvas RGBA `out` tại (x, y) bằng glyph cache.
+    Trả False nếu gặp ký tự ngoài bảng chữ (caller rơi về đường PIL).
+    """
+    table = _glyph_table(font)
+    r, g, b = color
+    cx = x
+    for ch in text:
+        entry = table.get(ch)
+        if entry is None:
+            return False
+        tile, adv = entry
+        _blit_glyph(out, tile, cx, y, r, g, b)
+        cx += adv
+    return True
+
+
+def line_width(text: str, font) -> Optional[int]:
+    """Tổng advance của dòng theo glyph cache; None nếu có ký tự lạ."""
+    table = _glyph_table(font)
+    total = 0
+    for ch in text:
+        entry = table.get(ch)
+        if entry is None:
+            return None
+        total += entry[1]
+    return total
+
+
+if HAS_NUMBA:
+    # warmup: trả chi phí compile lúc import thay vì giữa lúc render
+    _blit_glyph(np.zeros((2, 2, 4), np.uint8),
+                np.ones((1, 1), np.uint8), 0, 0, 255, 255, 255)
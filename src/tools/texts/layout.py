@@ -1,13 +1,223 @@
 """ Layout utilities and low-level text primitives. """
 
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from cachetools import LRUCache, cached
 import numpy as np
-from moviepy import TextClip, ColorClip, CompositeVideoClip, VideoClip
-from math import ceil
-from typing import Optional
-from tools.schema.dataclass import Rect, Fonts, Style
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+from moviepy import ImageClip, ColorClip, CompositeVideoClip, VideoClip
 from math import ceil
 from typing import Any, Dict, Optional, List
-from moviepy import VideoClip, CompositeVideoClip, ColorClip
+from tools.schema.dataclass import Rect, Fonts, Style
+from .wrap import greedy_break
+from . import fastglyph
+
+# Draw "đo đạc" dùng chung — chỉ cần cho textlength, không vẽ gì
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+
+# v_align theo element_id — bảng module thay cho if/in set dựng mỗi call
+_V_ALIGN = {
+    "section_marker": "center",
+    "equation": "center",
+    "quiz_question": "center",
+    "quiz_feedback": "center",
+    "cta": "center",
+    "captions": "bottom",
+}
+
+@dataclass(slots=True, frozen=True)
+class ElementType:
+    """spec["types"] entry đã "phẳng hoá": attribute fetch thay cho chuỗi
+    dict lookup lồng nhau (layout[variant]["rect"], size["common"], ...)."""
+    primary_rect: tuple
+    alternate_rect: tuple
+    primary_align: str
+    alternate_align: str
+    px: int
+    mono: bool
+
+    def rect(self, variant: str) -> tuple:
+        return self.alternate_rect if variant == "alternate" else self.primary_rect
+
+    def align(self, variant: str) -> str:
+        return self.alternate_align if variant == "alternate" else self.primary_align
+
+# Cache compile theo identity, chặn LRU 64 spec: dict trần giữ strong ref
+# mọi spec từng thấy đến hết tiến trình. Entry giữ ref spec để id không
+# bị tái dùng cho object khác khi spec cũ bị gc.
+_compiled_specs: LRUCache = LRUCache(maxsize=64)
+
+def _compile_spec(spec: Dict[str, Any]) -> Dict[str, ElementType]:
+    """Biên dịch spec một lần (cache theo identity, LRU-bounded)."""
+    entry = _compiled_specs.get(id(spec))
+    if entry is None or entry[0] is not spec:
+        out = {}
+        for t in spec["types"]:
+            primary = t["layout"]["primary"]
+            alternate = t["layout"].get("alternate", primary)
+            out[t["id"]] = ElementType(
+                primary_rect=tuple(primary["rect"]),
+                alternate_rect=tuple(alternate["rect"]),
+                primary_align=primary.get("align", "left"),
+                alternate_align=alternate.get("align", "left"),
+                px=int(t["size"]["common"]),
+                mono=bool(t["size"].get("mono")),
+            )
+        entry = (spec, out)
+        _compiled_specs[id(spec)] = entry
+    return entry[1]
+
+# (pad_top, pad_bottom) đã chốt theo (px, pct, font) — cùng một nhúm
+# tổ hợp lặp lại cho cả timeline, khỏi tính ceil/max mỗi slot
+_pad_cache: dict = {}
+
+def _compute_pads(px: int, style, font_path: Optional[str] = None,
+                    min_top_pct: float = 0.0, min_bot_pct: float = 0.0) -> tuple:
+    """
+    (pad_top, pad_bottom) tính từ px và style, cache theo tổ hợp tham số.
+    style.baseline_pad_pct=None -> tự suy từ metric font
+    (suggest_baseline_pad_pct, đã cache).
+    """
+    key = (px, style.top_pad_pct, style.baseline_pad_pct,
+            font_path, min_top_pct, min_bot_pct)
+    v = _pad_cache.get(key)
+    if v is None:
+        top_pct = max(min_top_pct, style.top_pad_pct)
+        bot_pct = style.baseline_pad_pct
+        if bot_pct is None:
+            if font_path:
+                from .core import suggest_baseline_pad_pct
+                bot_pct = suggest_baseline_pad_pct(font_path)
+            else:
+                bot_pct = 0.32
+        bot_pct = max(min_bot_pct, bot_pct)
+        v = (int(max(2, ceil(px * top_pct))), int(max(4, ceil(px * bot_pct))))
+        _pad_cache[key] = v
+    return v
+
+# Bề rộng từng từ theo (font, word) — caption lặp lại từ rất nhiều,
+# mỗi getlength là một lượt shaping FreeType
+_word_w_cache: dict = {}
+
+def _word_widths(words: List[str], font) -> np.ndarray:
+    out = np.empty(len(words), dtype=np.int32)
+    for i, word in enumerate(words):
+        key = (font, word)
+        v = _word_w_cache.get(key)
+        if v is None:
+            v = int(ceil(font.getlength(word)))
+            _word_w_cache[key] = v
+        out[i] = v
+    return out
+
+@lru_cache(maxsize=128)
+def _load_font(font_path: Optional[str], px: int) -> ImageFont.FreeTypeFont:
+    """
+    Mở (và cache) font theo (realpath, px) — mỗi truetype() là một lần
+    parse TTF, lặp lại hàng nghìn lần cho cùng font/size trong một timeline.
+    Key realpath để symlink không tạo entry trùng.
+    """
+    if font_path:
+        return ImageFont.truetype(os.path.realpath(font_path), px)
+    return ImageFont.load_default(px)
+
+def _wrap_lines(text: str, font, max_w: int) -> List[str]:
+    """
+    Bẻ dòng greedy, giữ nguyên line break có sẵn. Bề rộng từng từ được đo
+    một lần (cache theo (font, word)); vòng gom từ chạy trong greedy_break
+    (JIT khi có numba) thay vì đo lại cả dòng O(words²) bằng textlength.
+    """
+    lines: List[str] = []
+    space_w = int(ceil(font.getlength(" ")))
+    for para in text.split("\n"):
+        words = para.split()
+        if not words:
+            lines.append("")
+            continue
+        widths = _word_widths(words, font)
+        starts = greedy_break(widths, space_w, int(max_w))
+        for k in range(len(starts)):
+            end = starts[k + 1] if k + 1 < len(starts) else len(words)
+            lines.append(" ".join(words[starts[k]:end]))
+    return lines
+
+# Timeline hay lặp lại nguyên chuỗi (section title, bullet, caption):
+# cache mảng RGBA đã raster theo toàn bộ tham số render — hit là bỏ qua
+# cả đo đạc lẫn rasterize. Mảng trả về coi như read-only.
+_label_cache: LRUCache = LRUCache(maxsize=512)
+
+@cached(_label_cache)
+def _pil_render_label(
+    text: str,
+    font_path: Optional[str],
+    px: int,
+    color,
+    stroke_color=None,
+    stroke_width: int = 0,
+    width: Optional[int] = None,
+    text_align: str = "left",
+    interline: int = 6,
+) -> np.ndarray:
+    """
+    Rasterize text thẳng bằng Pillow thành mảng RGBA (uint8):
+    không subprocess, không encode/decode PNG trung gian như backend
+    TextClip. width=None -> label một khối tự co; width=w -> wrap.
+    """
+    font = _load_font(font_path, px)
+    stroke_width = int(stroke_width or 0)
+
+    if width:
+        lines = _wrap_lines(text, font, max(1, int(width) - 2 * stroke_width))
+    else:
+        lines = text.split("\n")
+
+    ascent, descent = font.getmetrics()
+    line_h = ascent + descent + int(interline)
+    widths = [_MEASURE_DRAW.textlength(ln, font=font) for ln in lines]
+    W = int(width) if width else int(ceil(max(widths))) + 2 * stroke_width
+    H = line_h * len(lines) - int(interline) + 2 * stroke_width
+    W, H = max(1, W), max(1, H)
+
+    img = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    y = stroke_width
+    for ln, lw in zip(lines, widths):
+        if text_align == "center":
+            x = (W - lw) / 2.0
+        elif text_align == "right":
+            x = W - lw - stroke_width
+        else:
+            x = stroke_width
+        if ln:
+            draw.text((x, y), ln, font=font, fill=color,
+                      stroke_width=stroke_width, stroke_fill=stroke_color)
+        y += line_h
+    return np.asarray(img)
+
+# ----
+
+def _fast_render_label(text: str, font_path: Optional[str], px: int,
+                       color) -> Optional[np.ndarray]:
+    """
+    Đường raster nhanh cho label một dòng (mode_hint == "fast"):
+    composite glyph đã raster sẵn qua kernel numba (xem fastglyph).
+    Trả None nếu text có ký tự ngoài bảng glyph -> caller rơi về PIL.
+    """
+    font = _load_font(font_path, px)
+    W = fastglyph.line_width(text, font)
+    if W is None:
+        return None
+    try:
+        rgb = ImageColor.getrgb(color) if isinstance(color, str) else tuple(color)
+    except ValueError:
+        return None
+    ascent, descent = font.getmetrics()
+    out = np.zeros((max(1, ascent + descent), max(1, W), 4), dtype=np.uint8)
+    if not fastglyph.render_line(text, font, rgb[:3], out, 0, 0):
+        return None
+    return out
+
 # ----
 
 def _pad_transparent(
@@ -33,6 +243,24 @@ def _pad_transparent(
     Returns:
         VideoClip: The padded clip with the original content positioned accordingly.
     """
+    # Ảnh tĩnh: chỉ cần copy vào một canvas RGBA to hơn — không cần
+    # ColorClip + CompositeVideoClip (mỗi cái là một node blit per-frame).
+    if isinstance(clip, ImageClip) and getattr(clip, "img", None) is not None:
+        img = np.clip(clip.img, 0, 255).astype(np.uint8)
+        h, w = img.shape[:2]
+        canvas = np.zeros((h + top + bottom, w + left + right, 4), dtype=np.uint8)
+        canvas[top:top + h, left:left + w, :3] = img[..., :3]
+        if clip.mask is not None and getattr(clip.mask, "img", None) is not None:
+            canvas[top:top + h, left:left + w, 3] = \
+                (np.clip(clip.mask.img, 0.0, 1.0) * 255).astype(np.uint8)
+        else:
+            canvas[top:top + h, left:left + w, 3] = 255
+        out = ImageClip(canvas, transparent=True)
+        if clip.duration:
+            out = out.with_duration(clip.duration)
+        return out
+
+    # Clip động (payload-is-clip): giữ đường composite cũ
     width = clip.w + left + right
     height = clip.h + top + bottom
 
@@ -55,7 +283,8 @@ def _mk_text_clip(
     font_path: Optional[str],
     px: int,
     text_align: str,
-    style
+    style,
+    pad: bool = True
 ) -> VideoClip:
     """
     Create a text clip safely, preventing descenders/diacritics from being cropped.
@@ -71,9 +300,12 @@ def _mk_text_clip(
         px (int): Font size in pixels.
         text_align (str): Horizontal text alignment ("left", "center", "right").
         style: Style configuration object with color, stroke, padding, etc.
+        pad (bool): Apply safe padding here. Callers that pad themselves
+            (wrapped_text_clip, render_text_element, ...) pass False so the
+            clip is only padded once.
 
     Returns:
-        VideoClip: A MoviePy clip with safe padding applied.
+        VideoClip: A MoviePy clip, with safe padding applied when `pad`.
     """
     _, _, w, _ = rect
 
@@ -83,46 +315,53 @@ def _mk_text_clip(
     heuristic_wrap = is_multiline_input or (w and len(text) > 22)
     use_wrap = (mode_hint == "wrap") or (mode_hint is None and heuristic_wrap)
 
-    # Render text
-    if use_wrap:
-        # Caption mode: wrap text to width, apply interline spacing, honor text alignment
-        base = TextClip(
-            text=text,
-            font=font_path,
-            font_size=px,
-            color=style.color,
-            method="caption",
-            size=(w, None),
-            text_align=text_align,
-            interline=getattr(style, "interline", 6),
-            stroke_color=style.stroke_color,
-            stroke_width=style.stroke_width,
-            transparent=True
-        )
-    else:
-        # Label mode: single line, cleaner bbox for descenders
-        base = TextClip(
-            text=text,
-            font=font_path,
-            font_size=px,
-            color=style.color,
-            method="label",
+    # mode_hint="fast": label một dòng đi qua glyph cache + kernel numba;
+    # None nghĩa là ký tự lạ / stroke -> rơi về đường PIL bên dưới
+    arr = None
+    if (mode_hint == "fast" and not use_wrap and not is_multiline_input
+            and not style.stroke_width):
+        arr = _fast_render_label(text, font_path, px, style.color)
+
+    # Render text thẳng bằng Pillow (xem _pil_render_label)
+    if arr is None:
+        arr = _pil_render_label(
+            text,
+            font_path,
+            px,
+            style.color,
             stroke_color=style.stroke_color,
             stroke_width=style.stroke_width,
-            transparent=True
+            width=w if use_wrap else None,
+            text_align=text_align,
+            interline=getattr(style, "interline", 6),
         )
+    base = ImageClip(arr, transparent=True)
+    if not pad:
+        return base
 
-    # Safe padding percentages
-    top_pct = max(0.06, getattr(style, "top_pad_pct", 0.10))
-    bot_pct = max(0.24, getattr(style, "baseline_pad_pct", 0.32))
-    pad_top = int(max(2, ceil(px * top_pct)))
-    pad_bottom = int(max(4, ceil(px * bot_pct)))
+    # Safe padding (cache theo (px, style, font) — xem _compute_pads)
+    pad_top, pad_bottom = _compute_pads(px, style, font_path,
+                                        min_top_pct=0.06, min_bot_pct=0.24)
 
     # Apply transparent padding to avoid cropping in alpha mask
     return _pad_transparent(base, 0, pad_top, 0, pad_bottom, bg_opacity=0.01)
 
 #---
 
+# Dispatch table căn lề — resolve function một lần thay vì so sánh
+# string mỗi call trên đường layout nóng
+def _align_start(o, outer, inner):
+    return o
+
+def _align_center(o, outer, inner):
+    return o + max(0, (outer - inner) // 2)
+
+def _align_end(o, outer, inner):
+    return o + max(0, outer - inner)
+
+_H_ALIGN_FN = {"left": _align_start, "center": _align_center, "right": _align_end}
+_V_ALIGN_FN = {"top": _align_start, "center": _align_center, "bottom": _align_end}
+
 def _place_in_rect(
     clip: VideoClip,
     rect: Rect,
@@ -142,21 +381,8 @@ def _place_in_rect(
         VideoClip: Clip positioned relative to the rectangle.
     """
     x, y, w, h = rect
-
-    if h_align == "center":
-        px = x + max(0, (w - clip.w) // 2)
-    elif h_align == "right":
-        px = x + max(0, (w - clip.w))
-    else:  # left
-        px = x
-
-    if v_align == "center":
-        py = y + max(0, (h - clip.h) // 2)
-    elif v_align == "bottom":
-        py = y + max(0, (h - clip.h))
-    else:  # top
-        py = y
-
+    px = _H_ALIGN_FN.get(h_align, _align_start)(x, w, clip.w)
+    py = _V_ALIGN_FN.get(v_align, _align_start)(y, h, clip.h)
     return clip.with_position((px, py))
 
 
@@ -173,11 +399,25 @@ def _fit_into_rect(clip: VideoClip, rect: Rect) -> VideoClip:
     """
     _, _, w, h = rect
 
-    if clip.w > w or clip.h > h:
-        scale = max(clip.w / w, clip.h / h)
-        clip = clip.resized(new_size=(int(clip.w / scale), int(clip.h / scale)))
+    if clip.w <= w and clip.h <= h:
+        return clip  # đã vừa — không đụng đến frame buffer
+
+    # Ảnh tĩnh: thumbnail Lanczos của PIL trên mảng RGBA, không qua
+    # clip.resized (tái cấp phát + wrapper per-frame)
+    if isinstance(clip, ImageClip) and getattr(clip, "img", None) is not None:
+        img = np.clip(clip.img, 0, 255).astype(np.uint8)
+        if clip.mask is not None and getattr(clip.mask, "img", None) is not None:
+            alpha = (np.clip(clip.mask.img, 0.0, 1.0) * 255).astype(np.uint8)
+            img = np.dstack([img[..., :3], alpha])
+        im = Image.fromarray(img)
+        im.thumbnail((w, h), Image.Resampling.LANCZOS)
+        out = ImageClip(np.asarray(im), transparent=(im.mode == "RGBA"))
+        if clip.duration:
+            out = out.with_duration(clip.duration)
+        return out
 
-    return clip
+    scale = max(clip.w / w, clip.h / h)
+    return clip.resized(new_size=(int(clip.w / scale), int(clip.h / scale)))
 
 
 def _caption_bg(
@@ -196,6 +436,30 @@ def _caption_bg(
     Returns:
         VideoClip: A composite clip with the background and text.
     """
+    # Ảnh tĩnh: blend alpha-over thẳng trên mảng RGBA — không cần
+    # ColorClip + CompositeVideoClip per caption.
+    if isinstance(text_clip, ImageClip) and getattr(text_clip, "img", None) is not None:
+        img = np.clip(text_clip.img, 0, 255).astype(np.uint8)
+        h, w = img.shape[:2]
+        if text_clip.mask is not None and getattr(text_clip.mask, "img", None) is not None:
+            src_a = np.clip(text_clip.mask.img, 0.0, 1.0).astype(np.float32)
+        else:
+            src_a = np.ones((h, w), np.float32)
+
+        canvas = np.zeros((h + 2 * pad, w + 2 * pad, 4), np.uint8)
+        canvas[..., 3] = int(round(255 * opacity))
+        # text (src) over nền đen bg_a=opacity
+        out_a = src_a + opacity * (1.0 - src_a)
+        rgb = img[..., :3].astype(np.float32) * src_a[..., None] \
+            / np.maximum(out_a[..., None], 1e-6)
+        canvas[pad:pad + h, pad:pad + w, :3] = np.clip(rgb, 0, 255).astype(np.uint8)
+        canvas[pad:pad + h, pad:pad + w, 3] = np.clip(out_a * 255, 0, 255).astype(np.uint8)
+
+        out = ImageClip(canvas, transparent=True)
+        if text_clip.duration:
+            out = out.with_duration(text_clip.duration)
+        return out
+
     width = text_clip.w + pad * 2
     height = text_clip.h + pad * 2
 
@@ -210,6 +474,14 @@ def _caption_bg(
         size=(width, height)
     )
 
+
+def _debug_box(w: int, h: int, opacity: float) -> ImageClip:
+    """Hộp debug trắng mờ dạng ImageClip RGBA — thay ColorClip.with_opacity."""
+    arr = np.empty((h, w, 4), np.uint8)
+    arr[..., :3] = 255
+    arr[..., 3] = int(round(255 * opacity))
+    return ImageClip(arr, transparent=True)
+
 #---
 
 def wrapped_text_clip(
@@ -247,23 +519,23 @@ def wrapped_text_clip(
     fonts = fonts or Fonts()
     style = style or Style()
 
-    element_type = next(x for x in spec["types"] if x["id"] == element_id)
-    layout = element_type["layout"]["alternate" if variant == "alternate" else "primary"]
-    rect = tuple(layout["rect"])
-    h_align = layout.get("align", "left")
-    px = int(element_type["size"]["common"])
+    et = _compile_spec(spec)[element_id]
+    rect = et.rect(variant)
+    h_align = et.align(variant)
+    px = et.px
 
+    font_path = fonts.mono if et.mono else fonts.sans
     base = _mk_text_clip(
         text,
         rect,
-        fonts.mono if element_type["size"].get("mono") else fonts.sans,
+        font_path,
         px,
         h_align,
-        style
+        style,
+        pad=False  # pad một lần duy nhất ngay dưới đây
     )
 
-    pad_top = int(max(2, ceil(px * style.top_pad_pct)))
-    pad_bottom = int(max(4, ceil(px * style.baseline_pad_pct)))
+    pad_top, pad_bottom = _compute_pads(px, style, font_path)
     clip = _pad_transparent(base, 0, pad_top, 0, pad_bottom)
 
     allowed_h = rect[3]
@@ -283,12 +555,7 @@ def wrapped_text_clip(
             new_size=(max(1, int(clip.w * scale)), max(1, int(clip.h * scale)))
         )
 
-    if element_id in {"section_marker", "equation", "quiz_question", "quiz_feedback", "cta"}:
-        v_align = "center"
-    elif element_id == "captions":
-        v_align = "bottom"
-    else:
-        v_align = "top"
+    v_align = _V_ALIGN.get(element_id, "top")
 
     if element_id == "captions":
         clip = _caption_bg(clip, pad=max(style.pad, 14), opacity=0.65)
@@ -303,8 +570,7 @@ def wrapped_text_clip(
     if debug_rect:
         x, y, w, h = rect
         box = (
-            ColorClip((w, h), color=(255, 255, 255))
-            .with_opacity(0.15)
+            _debug_box(w, h, 0.15)
             .with_duration(placed.duration or duration)
             .with_position((x, y))
         )
@@ -351,68 +617,135 @@ def structured_multiline_clip(
     fonts = fonts or Fonts()
     style = style or Style()
 
-    element_type = next(x for x in spec["types"] if x["id"] == element_id)
-    layout = element_type["layout"]["alternate" if variant == "alternate" else "primary"]
-    rect = tuple(layout["rect"])
-    base_align = layout.get("align", "left")
-    h_align = h_align_override or base_align
-    px = int(element_type["size"]["common"])
+    et = _compile_spec(spec)[element_id]
+    rect = et.rect(variant)
+    h_align = h_align_override or et.align(variant)
+    px = et.px
+
+    # Các item chung font/px/style -> vẽ TẤT CẢ trong một pass PIL trên
+    # một canvas duy nhất; stagger chỉ là cắt lát hàng theo boundary item
+    # (numpy slice trên mask), không re-raster, không composite.
+    font_path = fonts.mono if et.mono else fonts.sans
+    pad_top, pad_bottom = _compute_pads(px, style, font_path)
+    font = _load_font(font_path, px)
+    stroke = int(style.stroke_width or 0)
+    interline = int(getattr(style, "interline", 6))
+    ascent, descent = font.getmetrics()
+    line_h = ascent + descent + interline
+    x, y, w, h = rect
+    mode_hint = getattr(style, "mode_hint", None)
 
-    line_clips = []
+    # đo + bẻ dòng từng item (cùng heuristic với _mk_text_clip)
+    items = []
     for s in lines:
-        base = _mk_text_clip(
-            s,
-            rect,
-            fonts.mono if element_type["size"].get("mono") else fonts.sans,
-            px,
-            h_align,
-            style
-        )
-        pad_top = int(max(2, ceil(px * style.top_pad_pct)))
-        pad_bottom = int(max(4, ceil(px * style.baseline_pad_pct)))
-        c = _pad_transparent(base, 0, pad_top, 0, pad_bottom)
-        line_clips.append(c)
+        heuristic_wrap = "\n" in s or (w and len(s) > 22)
+        use_wrap = (mode_hint == "wrap") or (mode_hint is None and heuristic_wrap)
+        sublines = _wrap_lines(s, font, max(1, int(w) - 2 * stroke)) \
+            if use_wrap else s.split("\n")
+        widths = [_MEASURE_DRAW.textlength(ln, font=font) for ln in sublines]
+        text_h = line_h * len(sublines) - interline + 2 * stroke
+        items.append((sublines, widths, text_h))
 
     gap = gap_px if gap_px is not None else max(6, int(px * 0.25))
-    total_h = sum(c.h for c in line_clips) + gap * (len(line_clips) - 1)
-
-    rect_h = rect[3]
+    blocks = [pad_top + text_h + pad_bottom for _, _, text_h in items]
+    total_h = sum(blocks) + gap * (len(items) - 1)
+
+    img = Image.new("RGBA", (max(1, int(w)), max(1, total_h)), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    y_cur = 0
+    bounds = []  # row (trong block canvas) kết thúc từng item
+    for (sublines, widths, _), bh in zip(items, blocks):
+        ty = y_cur + pad_top + stroke
+        for ln, lw in zip(sublines, widths):
+            if h_align == "center":
+                tx = (w - lw) / 2.0
+            elif h_align == "right":
+                tx = w - lw - stroke
+            else:
+                tx = stroke
+            if ln:
+                draw.text((tx, ty), ln, font=font, fill=style.color,
+                            stroke_width=stroke, stroke_fill=style.stroke_color)
+            ty += line_h
+        y_cur += bh + gap
+        bounds.append(min(total_h, y_cur))
+
+    rect_h = h
     if total_h > rect_h:
         scale = rect_h / float(total_h)
-        for i in range(len(line_clips)):
-            c = line_clips[i]
-            line_clips[i] = c.resized(
-                new_size=(max(1, int(c.w * scale)), max(1, int(c.h * scale)))
-            )
-        gap = int(gap * scale)
-        total_h = sum(c.h for c in line_clips) + gap * (len(line_clips) - 1)
+        nw = max(1, int(w * scale))
+        nh = max(1, int(total_h * scale))
+        img = img.resize((nw, nh), Image.Resampling.LANCZOS)
+        bounds = [min(nh, int(b * scale)) for b in bounds]
+        total_h = nh
+    block = np.asarray(img)
+    bh_, bw_ = block.shape[:2]
 
-    x, y, w, h = rect
     if v_align == "center":
         y0 = y + max(0, (h - total_h) // 2)
     elif v_align == "bottom":
         y0 = y + max(0, h - total_h)
     else:
         y0 = y
-
-    placed = []
-    y_cursor = y0
-    for i, c in enumerate(line_clips):
-        placed_i = _place_in_rect(c, (x, y_cursor, w, c.h), h_align=h_align, v_align="top")
-        start_i = i * max(0.0, float(stagger))
-        live_dur = max(0.001, duration - start_i)
-        placed.append(placed_i.with_start(start_i).with_duration(live_dur))
-        y_cursor += c.h + gap
-
-    comp = CompositeVideoClip(placed, size=(1920, 1080)).with_duration(duration)
+    if h_align == "center":
+        x0 = x + max(0, (w - bw_) // 2)
+    elif h_align == "right":
+        x0 = x + max(0, w - bw_)
+    else:
+        x0 = x
+
+    # một lần paste vào canvas full-frame
+    full = np.zeros((1080, 1920, 4), dtype=np.uint8)
+    y1, x1 = max(0, y0), max(0, x0)
+    y2, x2 = min(1080, y0 + bh_), min(1920, x0 + bw_)
+    if y2 > y1 and x2 > x1:
+        full[y1:y2, x1:x2] = block[y1 - y0:y2 - y0, x1 - x0:x2 - x0]
+
+    # Trạng thái k chỉ khác nhau ở cutoff hàng — giữ MỘT plane alpha uint8
+    # dùng chung + danh sách cutoff thay vì n+1 bản mask float32 full-frame
+    # (~8.3MB/bản) sống suốt đời clip trong closure; mask từng frame được
+    # cắt lát từ plane chung lúc render.
+    rgb = full[..., :3]
+    alpha_u8 = full[..., 3]
+    starts_a = np.asarray([i * max(0.0, float(stagger)) for i in range(len(items))])
+    cutoffs = [0] + [max(0, min(1080, y0 + b)) for b in bounds]
+
+    def _state(t):
+        return int(np.searchsorted(starts_a, t, side="right"))
+
+    def _mask_frame(t):
+        m = np.zeros((1080, 1920), dtype=np.float32)
+        hi = min(cutoffs[_state(t)], y2)
+        if hi > y1:
+            m[y1:hi] = alpha_u8[y1:hi] * np.float32(1.0 / 255.0)
+        return m
+
+    def _frame(t):
+        return rgb
 
     if debug_rect:
-        box = (
-            ColorClip((w, h), color=(255, 255, 255))
-            .with_opacity(0.12)
-            .with_duration(duration)
-            .with_position((x, y))
-        )
-        comp = CompositeVideoClip([box, comp], size=(1920, 1080)).with_duration(duration)
-
+        # blend hộp debug vào frame lúc render (box nằm DƯỚI text) —
+        # không thêm node composite nào, không giữ thêm canvas nào
+        ys = slice(max(0, y), min(1080, y + h))
+        xs = slice(max(0, x), min(1920, x + w))
+        _base_mask = _mask_frame
+
+        def _frame(t):
+            a_s = _base_mask(t)[ys, xs]
+            out_a = a_s + 0.12 * (1.0 - a_s)
+            out = rgb.copy()
+            out[ys, xs] = np.clip(
+                (out[ys, xs] * a_s[..., None] + 255.0 * 0.12 * (1.0 - a_s)[..., None])
+                / np.maximum(out_a[..., None], 1e-6), 0, 255).astype(np.uint8)
+            return out
+
+        def _mask_frame(t):
+            m = _base_mask(t)
+            a_s = m[ys, xs]
+            m[ys, xs] = a_s + 0.12 * (1.0 - a_s)
+            return m
+
+    comp = VideoClip(_frame, duration=duration)
+    comp.mask = VideoClip(_mask_frame, is_mask=True, duration=duration)
+    comp.size = (1920, 1080)
     return comp
\ No newline at end of file
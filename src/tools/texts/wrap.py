@@ -0,0 +1,46 @@
+""" JIT kernel cho vòng bẻ dòng greedy của _wrap_lines. """
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # numba là optional — rơi về pure Python
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        def wrap(fn):
+            return fn
+        return wrap
+
+
+@njit(cache=True)
+def greedy_break(widths: np.ndarray, space_w: int, max_w: int) -> np.ndarray:
+    """
+    Bẻ dòng greedy trên mảng bề rộng từng từ (int32): gom từ vào dòng
+    chừng nào tổng (width + space) còn <= max_w.
+
+    Returns:
+        int32[:] — index của từ MỞ ĐẦU mỗi dòng.
+    """
+    n = widths.shape[0]
+    starts = np.empty(n, np.int32)
+    starts[0] = 0
+    m = 1
+    cur = widths[0]
+    for i in range(1, n):
+        trial = cur + space_w + widths[i]
+        if trial <= max_w:
+            cur = trial
+        else:
+            starts[m] = i
+            m += 1
+            cur = widths[i]
+    return starts[:m]
+
+
+if HAS_NUMBA:
+    # warmup: trả chi phí compile lúc import thay vì giữa lúc render
+    greedy_break(np.array([10, 10, 10], dtype=np.int32), 4, 25)
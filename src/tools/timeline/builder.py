@@ -1,7 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import numpy as np
 from .core import _require, _normalize_graphics, _normalize_texts, _normalize_presenter
 from tools.schema.dataclass import Meta, TextSpec, PresenterSpec, GraphicSpec, Scene, Rect
 from typing import Optional, Literal, List, Tuple
 from tools.geometry.core import place_in_rect
+
+_scene_pool: Optional[ThreadPoolExecutor] = None
+
+def _get_scene_pool() -> ThreadPoolExecutor:
+    """Pool mặc định cho build_scene — tạo lười, dùng lại cho mọi scene."""
+    global _scene_pool
+    if _scene_pool is None:
+        _scene_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4)
+    return _scene_pool
+
 def build_scene (
     *,
     meta: Meta, 
@@ -14,6 +27,7 @@ def build_scene (
     graphics: list[GraphicSpec],
     presenter: Optional[PresenterSpec] = None,
     transition_out: dict | None = None,
+    executor: Optional[ThreadPoolExecutor] = None,
 ) -> Scene:
     """
     Tạo một Scene với các thông tin đã cho.
@@ -29,6 +43,8 @@ def build_scene (
         graphics: Danh sách các GraphicSpec cho các đồ họa.
         presenter: Thông tin về người trình bày (nếu có).
         transition_out: Thông tin về hiệu ứng chuyển cảnh ra ngoài (nếu có).
+        executor: Pool để chạy song song các pass normalize độc lập
+            (texts / graphics / presenter); mặc định dùng pool module.
 
     Returns:
         Một đối tượng Scene đã được tạo.
@@ -39,19 +55,32 @@ def build_scene (
         any(k in background for k in ["color", "video", "image"]),
         "Background must contain at least one of 'color', 'video', or 'image'"
     )
-    text_norms = _normalize_texts(slots or [], meta)
-    graphic_norms = _normalize_graphics(graphics or [], meta)
-    presenter_norm = _normalize_presenter(presenter, meta) if presenter else None
-    for t in text_norms:
-        x,y,w,h = t.rect
-        _require(w > 0 and h > 0, f"TextSpec {t.slot_id} must have positive width and height")
-    for g in graphic_norms:
-        if g.layout:
-            gx, gy, gw, gh = g.layout.rect
-            _require(gw >0 and gh > 0, f"GraphicSpec {g.src} must have positive width and height")
+    # Ba pass normalize độc lập nhau (spec read-only, lắp Scene thuần) ->
+    # chạy song song; scene nhỏ (không presenter, ít slot) thì chạy thẳng.
+    if slots and (graphics or presenter):
+        pool = executor or _get_scene_pool()
+        f_texts = pool.submit(_normalize_texts, slots or [], meta)
+        f_graphics = pool.submit(_normalize_graphics, graphics or [], meta)
+        presenter_norm = _normalize_presenter(presenter, meta) if presenter else None
+        text_norms = f_texts.result()
+        graphic_norms = f_graphics.result()
+    else:
+        text_norms = _normalize_texts(slots or [], meta)
+        graphic_norms = _normalize_graphics(graphics or [], meta)
+        presenter_norm = _normalize_presenter(presenter, meta) if presenter else None
+    # Validate mọi rect trong MỘT phép so sánh numpy thay vì 3 vòng Python
+    # per scene; label chỉ dựng lại khi thực sự có rect hỏng.
+    labeled = [(t.rect, "TextSpec", t.slot_id) for t in text_norms]
+    labeled += [(g.layout.rect, "GraphicSpec", g.src)
+                for g in graphic_norms if g.layout]
     if presenter_norm:
-        px, py, pw, ph = presenter_norm.rect
-        _require(pw > 0 and ph > 0, f"PresenterSpec {presenter_norm.src} must have positive width and height")
+        labeled.append((presenter_norm.rect, "PresenterSpec", presenter_norm.src))
+    if labeled:
+        rects = np.array([r for r, _, _ in labeled], dtype=np.int32)
+        bad = (rects[:, 2] <= 0) | (rects[:, 3] <= 0)
+        if bad.any():
+            _, kind, name = labeled[int(np.argmax(bad))]
+            _require(False, f"{kind} {name} must have positive width and height")
     return Scene(
         id=scene_id,
         type=scene_type,
@@ -65,17 +94,19 @@ def build_scene (
     )
     
 # Neo text -> cho renderer
-def compute_text_anchor_rect(dst_rect: Rect, 
-                                text_wh: Tuple[int, int], 
+# x-left theo align, resolve qua bảng thay vì so sánh string mỗi call
+_ANCHOR_X = {
+    "left": lambda ax, tw: ax,
+    "center": lambda ax, tw: ax - tw // 2,
+    "right": lambda ax, tw: ax - tw,
+}
+
+def compute_text_anchor_rect(dst_rect: Rect,
+                                text_wh: Tuple[int, int],
                                 align: Literal["left", "center", "right"]
                             ) -> Rect:
     ax, cy = place_in_rect(dst_rect, align)
     tw, th = text_wh
-    if align == "left":
-        x = ax
-    elif align == "center":
-        x = ax - tw // 2
-    else:  # right
-        x = ax - tw
+    x = _ANCHOR_X.get(align, _ANCHOR_X["right"])(ax, tw)
     y = cy - th // 2
     return Rect(x, y, tw, th)
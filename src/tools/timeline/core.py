@@ -2,9 +2,12 @@ from __future__ import annotations
 from tools.schema.dataclass import (
     Scene, TextSpec, GraphicSpec, PresenterSpec, Meta, MotionSpec, Rect, Style, Fonts, Layout
 )
-from dataclasses import asdict
 from typing import Any, Dict, List, Optional, Union, Tuple
-from tools.geometry.core import snap_to_safe, fit_into_rect, place_in_rect, warn_if_upscale
+from functools import lru_cache
+import numpy as np
+from tools.geometry.core import (
+    snap_to_safe, snap_to_safe_vec, fit_into_rect, place_in_rect, warn_if_upscale
+)
 
 
 def _require(cond: bool, msg: str):
@@ -19,141 +22,192 @@ _ROLE_DEFAULT_Z = {
     "special": 40,
 }
 
+# Message lỗi hoisted lên module — f-string chỉ format khi THỰC SỰ fail,
+# không stringify dict_keys mỗi vòng lặp item
+_VALID_ROLES_MSG = f"Must be one of {tuple(_ROLE_DEFAULT_Z)}"
+
+@lru_cache(maxsize=2048)
+def _snap_cached(rect_t: Tuple[int, int, int, int], meta: Meta) -> Rect:
+    """
+    snap_to_safe memoized theo (rect, meta) — nhiều item dùng chung rect
+    (title bar, logo...) nên lần lặp lại chỉ còn một dict probe.
+    Meta frozen nên hash được trực tiếp.
+    """
+    return snap_to_safe(rect_t, meta)
+
 def _normalize_fonts(d: Optional[dict]) -> Fonts:
     """
     Chuyển đổi dict thành Fonts, đảm bảo các trường bắt buộc.
     """
-    if d is None:
-        return Fonts()
-    return Fonts(
-        sans=d.get("sans"),
-        mono=d.get("mono")
-    )
+    return Fonts._from_dict(d)
 
 def _normalize_style(d: Optional[dict]) -> Style:
     """
     Chuyển đổi dict thành Style, đảm bảo các trường bắt buộc.
+    Dựng positional qua _from_dict — không resolve keyword per field.
     """
-    if d is None:
-        return Style()
-    return Style(
-        color=d.get("color", "#ffffff"),
-        stroke_color= d.get("stroke_color", "#000000"),
-        stroke_width=d.get("stroke_width", 0),
-        opacity=d.get("opacity", 1.0),
-        pad= d.get("pad", 0),
-        interline= d.get("underline", 4),
-        baseline_pad_pct= d.get("baseline_pad_pct", 0.32),
-        top_pad_pct= d.get("top_pad_pct", 0.1),
-    )
+    return Style._from_dict(d)
+
 def _normalize_layout(d: Optional[dict]) -> Meta:
     """
     Chuyển đổi dict thành Layout, đảm bảo các trường bắt buộc.
     """
     rect = d.get("rect")
     _require(rect is not None and len(rect) == 4, "Layout rect must be a 4-tuple (x, y, w, h)")
-    return Layout(
-        rect=Rect(*rect),
-        mode=d.get("mode", "fit"),
-        align=d.get("align", "center"),
-        rotation=d.get("rotation", 0.0),
-        opacity=d.get("opacity", 1.0),
-        snap_safe=d.get("snap_safe", True)
-    )
+    return Layout._from_dict(d)
 def _apply_graphic_layout(
     layout: Layout,
     src_wh: Optional[Tuple[int, int]] = None,
     meta: Optional[Meta] = None
 ) -> Layout:
-    rect = snap_to_safe(layout.rect, meta) if layout.snap_safe else layout.rect
+    rect = _snap_cached(tuple(layout.rect), meta) if layout.snap_safe else layout.rect
     if src_wh:
         sw, sh = src_wh
-        dst_rect = fit_into_rect(rect, (sw, sh), mode=layout.mode)
+        dst_rect = fit_into_rect(sw, sh, rect, mode=layout.mode)
         warn_if_upscale(src_wh, dst_rect, limit=1.5)
         rect = dst_rect
-    return Layout(
-        rect=rect,
-        mode=layout.mode,
-        align=layout.align,
-        rotation=layout.rotation,
-        opacity=layout.opacity,
-        snap_safe=layout.snap_safe
-    )
+    return Layout(rect, layout.mode, layout.align, layout.rotation,
+                  layout.opacity, layout.snap_safe)
+def _graphic_from_item(item: Dict[str, Any], meta: Optional[Meta],
+                       # bind vào default arg -> LOAD_FAST trên đường nóng
+                       _GraphicSpec=GraphicSpec, _roles=_ROLE_DEFAULT_Z,
+                       _nlayout=_normalize_layout,
+                       _apply=_apply_graphic_layout) -> GraphicSpec:
+    """Dựng một GraphicSpec từ dict spec (per-item work gộp một hàm)."""
+    g = item.get
+    role = g("role", "illustration")
+    if role not in _roles:
+        raise ValueError(f"Invalid role: {role}. {_VALID_ROLES_MSG}")
+    layout = _nlayout(g("layout"))
+
+    src_wh: Optional[Tuple[int, int]] = None
+    meta_dict = g("meta") or {}
+    if isinstance(meta_dict.get("size"), (list, tuple)) and len(meta_dict["size"]) == 2:
+        sw, sh = tuple(meta_dict["size"])
+        try:
+            sw_i = int(sw)
+            sh_i = int(sh)
+            if sw_i > 0 and sh_i > 0:
+                src_wh = (sw_i, sh_i)
+        except Exception:
+            src_wh = None
+    if layout:
+        layout = _apply(layout, src_wh, meta)
+    return _GraphicSpec(role, g("src"), g("color"), layout,
+                        g("z_hint", _roles[role]), g("loop", False),
+                        g("trim") if g("trim") else None, meta_dict)
+
 def _normalize_graphics (items: List[Dict[str, Any]], meta: Optional[Meta] = None) -> List[GraphicSpec]:
     if not items:
         return []
-    out: List[GraphicSpec] = []
-    for item in items:
-        role = item.get("role", "illustration")
-        _require(role in _ROLE_DEFAULT_Z, f"Invalid role: {role}. Must be one of {_ROLE_DEFAULT_Z.keys()}")
-        layout = _normalize_layout(item.get("layout"))
-        
-        src_wh: Optional[Tuple[int, int]] = None
-        meta_dict = item.get("meta") or {}
-        if isinstance(meta_dict.get("size"), (list, tuple)) and len(meta_dict["size"]) == 2:
-            sw,sh = tuple(meta_dict["size"])
-            try:
-                sw_i = int(sw)
-                sh_i = int(sh)
-                if sw_i > 0 and sh_i > 0:
-                    src_wh = (sw_i, sh_i)
-            except Exception:
-                src_wh = None
-        if layout:
-            layout = _apply_graphic_layout(layout, src_wh, meta)
-        z = item.get("z_hint", _ROLE_DEFAULT_Z[role])
-        out.append(
-            GraphicSpec(
-                role=role,
-                src=item.get("src"),
-                color=item.get("color"),
-                layout=layout,
-                z_hint=z,
-                loop=item.get("loop", False),
-                trim=item.get("trim") if item.get("trim") else None,
-                meta=meta_dict
-            )
-        )
-    return out
+    _mk = _graphic_from_item
+    return [_mk(item, meta) for item in items]
+def _text_from_item(item: Dict[str, Any],
+                    # bind constructor/helper vào default arg -> LOAD_FAST
+                    # thay vì LOAD_GLOBAL mỗi lần truy cập trên đường nóng
+                    _Rect=Rect, _TextSpec=TextSpec,
+                    _nstyle=_normalize_style, _nfont=_normalize_fonts) -> TextSpec:
+    """Dựng một TextSpec từ dict spec (toàn bộ per-item work gộp một hàm)."""
+    g = item.get
+    slot_id = g("slot_id")
+    if not slot_id:
+        raise ValueError("TextSpec must have a slot_id")
+    rect = g("rect")
+    if rect is None or len(rect) != 4:
+        raise ValueError("TextSpec rect must be a 4-tuple (x, y, w, h)")
+    return _TextSpec(slot_id, _nstyle(g("style")), _Rect(*rect),
+                     _nfont(g("font")), g("payload", ""), g("motion"),
+                     g("layer", 10), g("align", "left"))
+
 def _normalize_texts(items: List[Dict[str, Any]], meta: Optional[Meta] = None) -> List[TextSpec]:
     if not items:
         return []
-    out: List[TextSpec] = []
-    for item in items:
-        slot_id = item.get("slot_id")
-        _require(slot_id, "TextSpec must have a slot_id")
-        style = _normalize_style(item.get("style"))
-        rect = item.get("rect")
-        _require(rect is not None and len(rect) == 4, "TextSpec rect must be a 4-tuple (x, y, w, h)")
-        font = _normalize_fonts(item.get("font"))
-        payload = item.get("payload", "")
-        motion = item.get("motion")
-        layer = item.get("layer", 10)
-        align = item.get("align", "left")
-        
-        out.append(
-            TextSpec(
-                slot_id=slot_id,
-                style=style,
-                rect=Rect(*rect),
-                font=font,
-                payload=payload,
-                motion=motion,
-                layer=layer,
-                align=align
-            )
-        )
-    return out
+    _mk = _text_from_item
+    return [_mk(item) for item in items]
+
+class TextSpecBatch:
+    """
+    Container SoA (Structure-of-Arrays) cho một batch TextSpec:
+    rect/layer/align nằm trong mảng numpy liên tục để geometry chạy
+    vector một lượt trên cả batch (xem snap_to_safe_vec) thay vì N call
+    Python per item. Vẫn dùng được như list: len / iter / [i] trả
+    TextSpec (dựng lười, cache theo index).
+    """
+    __slots__ = ("rects", "layers", "aligns",
+                 "_slot_ids", "_styles", "_fonts", "_payloads",
+                 "_motions", "_cache")
+
+    def __init__(self, rects, layers, aligns, slot_ids, styles, fonts,
+                 payloads, motions):
+        self.rects = rects      # (N,4) int32
+        self.layers = layers    # (N,) int32
+        self.aligns = aligns    # (N,) unicode
+        self._slot_ids = slot_ids
+        self._styles = styles
+        self._fonts = fonts
+        self._payloads = payloads
+        self._motions = motions
+        self._cache: List[Optional[TextSpec]] = [None] * len(slot_ids)
+
+    @classmethod
+    def from_items(cls, items: List[Dict[str, Any]],
+                   meta: Optional[Meta] = None,
+                   snap_safe: bool = False) -> "TextSpecBatch":
+        """
+        Dựng batch từ dict spec trong MỘT vòng lặp fill mảng; validate
+        giống _normalize_texts. snap_safe=True kẹp cả batch vào
+        title-safe bằng một lượt snap_to_safe_vec.
+        """
+        n = len(items)
+        rects = np.empty((n, 4), dtype=np.int32)
+        layers = np.empty(n, dtype=np.int32)
+        aligns = np.empty(n, dtype="<U6")
+        slot_ids, styles, fonts, payloads, motions = [], [], [], [], []
+        for i, item in enumerate(items):
+            slot_id = item.get("slot_id")
+            if not slot_id:
+                raise ValueError("TextSpec must have a slot_id")
+            rect = item.get("rect")
+            if rect is None or len(rect) != 4:
+                raise ValueError("TextSpec rect must be a 4-tuple (x, y, w, h)")
+            rects[i] = rect
+            layers[i] = item.get("layer", 10)
+            aligns[i] = item.get("align", "left")
+            slot_ids.append(slot_id)
+            styles.append(_normalize_style(item.get("style")))
+            fonts.append(_normalize_fonts(item.get("font")))
+            payloads.append(item.get("payload", ""))
+            motions.append(item.get("motion"))
+        if snap_safe and meta is not None:
+            rects = snap_to_safe_vec(rects, meta)
+        return cls(rects, layers, aligns, slot_ids, styles, fonts,
+                   payloads, motions)
+
+    def __len__(self) -> int:
+        return len(self._slot_ids)
+
+    def __getitem__(self, i: int) -> TextSpec:
+        spec = self._cache[i]
+        if spec is None:
+            spec = TextSpec(self._slot_ids[i], self._styles[i],
+                            Rect(*(int(v) for v in self.rects[i])),
+                            self._fonts[i], self._payloads[i],
+                            self._motions[i], int(self.layers[i]),
+                            str(self.aligns[i]))
+            self._cache[i] = spec
+        return spec
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
 
 def _normalize_presenter(item: Optional[Dict[str, Any]], meta: Meta) -> Optional[PresenterSpec]:
     if not item:
         return None
-    _require("src" in item, "PresenterSpec must have a 'src' field")
-    _require("rect" in item, "PresenterSpec must have a 'rect' field")
-    rect = snap_to_safe(tuple(item["rect"]), meta)
-    return PresenterSpec(
-        src=item["src"],
-        rect=Rect(*rect),
-        shape=item.get("shape", "circle"),
-        layer=item.get("layer", 20)
-    )
\ No newline at end of file
+    if "src" not in item:
+        raise ValueError("PresenterSpec must have a 'src' field")
+    if "rect" not in item:
+        raise ValueError("PresenterSpec must have a 'rect' field")
+    rect = _snap_cached(tuple(item["rect"]), meta)
+    return PresenterSpec(item["src"], Rect(*rect),
+                         item.get("shape", "circle"), item.get("layer", 20))
\ No newline at end of file
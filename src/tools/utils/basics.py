@@ -1,5 +1,8 @@
+from math import floor as _floor
+
 def _clamp(v: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, v))
 
 def _round_i(v: float) -> int:
-    return int(round(v))
\ No newline at end of file
+    # floor(v + 0.5) rẻ hơn round() builtin (không banker's rounding)
+    return int(_floor(v + 0.5))
@@ -1,11 +1,56 @@
 import os
+import subprocess
+from functools import lru_cache
+from PIL import Image
 from moviepy import VideoClip, VideoFileClip
 
-def get_video_resolution(path: str) -> tuple[int, int]:
-    """Trả về (width, height) của video/ảnh."""
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"File not found: {path}")
+try:
+    import av
+except ImportError:  # PyAV là optional — rơi về ffprobe / MoviePy
+    av = None
+
+_IMAGE_EXTS = frozenset((".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".tiff"))
+
+
+@lru_cache(maxsize=1024)
+def _probe_resolution(path: str, _mtime_ns: int) -> tuple[int, int]:
+    """
+    Đọc (width, height) từ header container thay vì mở cả VideoFileClip
+    (spawn ffmpeg reader + decode frame đầu chỉ để lấy clip.size).
+    Thứ tự: PIL cho ảnh -> PyAV -> ffprobe -> MoviePy (fallback cuối).
+    """
+    if os.path.splitext(path)[1].lower() in _IMAGE_EXTS:
+        with Image.open(path) as im:
+            return im.size
+
+    if av is not None:
+        try:
+            with av.open(path) as container:
+                cc = container.streams.video[0].codec_context
+                return int(cc.width), int(cc.height)
+        except Exception:
+            pass
+
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0",
+             "-show_entries", "stream=width,height", "-of", "csv=p=0", path],
+            capture_output=True, text=True, timeout=10,
+        )
+        if out.returncode == 0:
+            w, h = out.stdout.strip().split(",")[:2]
+            return int(w), int(h)
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        pass
+
     clip = VideoFileClip(path)
     w, h = clip.size
     clip.close()
     return int(w), int(h)
+
+
+def get_video_resolution(path: str) -> tuple[int, int]:
+    """Trả về (width, height) của video/ảnh (cache theo path + mtime)."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"File not found: {path}")
+    return _probe_resolution(path, os.stat(path).st_mtime_ns)
@@ -1,29 +1,168 @@
 from __future__ import annotations
-import re, colorsys
+import os
+import re, colorsys, sys
+from functools import lru_cache
 from PIL import ImageColor, Image
 from typing import Union, List, Dict, Optional,Dict, Tuple
 import numpy as np
 from moviepy import VideoFileClip
 
+try:
+    import av
+except ImportError:  # PyAV là optional — rơi về MoviePy khi decode
+    av = None
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:  # numba là optional — rơi về đường numpy thuần
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        def wrap(fn):
+            return fn
+        return wrap
+
+
+@njit(parallel=True, cache=True)
+def _hist_rgb(frame: np.ndarray, q: int, B: int, stripes: int) -> np.ndarray:
+    """
+    Histogram lượng tử hoá (B^3 bin) đi thẳng trên frame uint8:
+    không dựng mảng idx trung gian, mỗi stripe hàng giữ histogram
+    riêng rồi cộng dồn — loop compiled, chạy song song theo hàng.
+    """
+    H, W = frame.shape[0], frame.shape[1]
+    nbins = B * B * B
+    partial = np.zeros((stripes, nbins), np.int64)
+    for s in prange(stripes):
+        y0 = s * H // stripes
+        y1 = (s + 1) * H // stripes
+        for y in range(y0, y1):
+            for x in range(W):
+                r = frame[y, x, 0] // q
+                g = frame[y, x, 1] // q
+                b = frame[y, x, 2] // q
+                partial[s, (r * B + g) * B + b] += 1
+    return partial.sum(axis=0)
+
+
+@njit(cache=True, fastmath=True)
+def _rgb_to_all(arr: np.ndarray, hsl: np.ndarray, hsv: np.ndarray,
+                cmyk: np.ndarray) -> None:
+    """
+    Kernel fused RGB -> HSL + HSV + CMYK cho mảng (N,3) uint8:
+    một pass duy nhất, r/g/b normalize dùng lại cho cả ba hệ màu,
+    ghi thẳng vào mảng output cấp sẵn (không intermediate).
+    """
+    for i in range(arr.shape[0]):
+        r = arr[i, 0] / 255.0
+        g = arr[i, 1] / 255.0
+        b = arr[i, 2] / 255.0
+        maxc = max(r, g, b)
+        minc = min(r, g, b)
+        delta = maxc - minc
+
+        if delta == 0.0:
+            h = 0.0
+        elif maxc == r:
+            h = (((g - b) / delta) % 6.0) * 60.0
+        elif maxc == g:
+            h = ((b - r) / delta + 2.0) * 60.0
+        else:
+            h = ((r - g) / delta + 4.0) * 60.0
+        h = h % 360.0
+
+        l = (maxc + minc) / 2.0
+        if delta == 0.0:
+            s_hsl = 0.0
+        elif l <= 0.5:
+            s_hsl = delta / (maxc + minc)
+        else:
+            s_hsl = delta / (2.0 - maxc - minc)
+        hsl[i, 0] = h
+        hsl[i, 1] = s_hsl * 100.0
+        hsl[i, 2] = l * 100.0
+
+        hsv[i, 0] = h
+        hsv[i, 1] = 0.0 if maxc == 0.0 else (delta / maxc) * 100.0
+        hsv[i, 2] = maxc * 100.0
+
+        k = 1.0 - maxc
+        if k == 1.0:
+            cmyk[i, 0] = 0.0
+            cmyk[i, 1] = 0.0
+            cmyk[i, 2] = 0.0
+        else:
+            inv = 1.0 - k
+            cmyk[i, 0] = (1.0 - r - k) / inv * 100.0
+            cmyk[i, 1] = (1.0 - g - k) / inv * 100.0
+            cmyk[i, 2] = (1.0 - b - k) / inv * 100.0
+        cmyk[i, 3] = k * 100.0
+
+
+if HAS_NUMBA:
+    # warmup: trả chi phí compile lúc import thay vì ở lần đếm đầu tiên
+    _hist_rgb(np.zeros((2, 2, 3), np.uint8), 16, 16, 1)
+    _rgb_to_all(np.zeros((1, 3), np.uint8), np.zeros((1, 3)),
+                np.zeros((1, 3)), np.zeros((1, 4)))
+
+
+def _first_frame(video: Union[str, "VideoFileClip", np.ndarray]) -> np.ndarray:
+    """
+    Lấy frame t=0: ndarray trả thẳng (caller đã decode sẵn); path đi
+    qua PyAV decode đúng một frame đầu (không dựng cả reader pipe của
+    MoviePy); còn lại rơi về clip.get_frame(0.0).
+    """
+    if isinstance(video, np.ndarray):
+        return video
+
+    if isinstance(video, str):
+        if av is not None:
+            try:
+                with av.open(video) as container:
+                    frame = next(container.decode(video=0))
+                    return frame.to_ndarray(format="rgb24")
+            except Exception:
+                pass
+        clip = VideoFileClip(video)
+        try:
+            return clip.get_frame(0.0)
+        finally:
+            clip.close()
+
+    return video.get_frame(0.0)
+
+
 def top_colors_first_frame(
-    video: Union[str, "VideoFileClip"],
+    video: Union[str, "VideoFileClip", np.ndarray],
     top_k: int = 10,
     quantize: int = 0,
     resize_to: Optional[int] = None,
     return_hex: bool = True,
+    include_conversions: bool = False,
+    method: str = "octree",
 ) -> List[Dict]:
     """
     Lấy frame đầu (t=0) và trả về top_k màu xuất hiện nhiều nhất.
 
     Params
     ------
-    video       : đường dẫn hoặc VideoFileClip (MoviePy v2).
+    video       : đường dẫn, VideoFileClip (MoviePy v2), hoặc frame
+                  (H,W,3|4) ndarray đã decode sẵn (bỏ qua open/decode).
     top_k       : số màu cần lấy (mặc định 10).
     quantize    : bước lượng tử hoá kênh màu (0 = đếm màu chính xác).
                   Ví dụ 16 -> gom màu theo bậc 16 (giảm nhiễu).
     resize_to   : nếu set (vd 720), sẽ downscale cạnh dài của frame
                   về <= giá trị này để tăng tốc đếm (không bắt buộc).
     return_hex  : có trả kèm mã HEX hay không.
+    include_conversions : trả kèm "hsl"/"hsv"/"cmyk" per màu, convert
+                  hàng loạt một lượt numpy (xem convert_colors_batch).
+    method      : "octree" (mặc định) dùng quantizer FASTOCTREE của PIL
+                  (C, O(n)) để gom màu trội; "exact" đếm đúng từng màu
+                  như trước. quantize > 1 luôn đi đường bin lượng tử.
 
     Returns
     -------
@@ -35,16 +174,7 @@ def top_colors_first_frame(
         "ratio": <tỷ lệ pixel trên toàn frame>
       }
     """
-    opened_here = False
-    clip = video
-    if isinstance(video, str):
-        clip = VideoFileClip(video)
-        opened_here = True
-    try:
-        frame = clip.get_frame(0.0)  # (H,W,3|4)
-    finally:
-        if opened_here:
-            clip.close()
+    frame = _first_frame(video)  # (H,W,3|4)
 
     # Chuẩn hoá về RGB uint8
     if frame.ndim != 3 or frame.shape[2] < 3:
@@ -57,47 +187,123 @@ def top_colors_first_frame(
         else:
             frame = np.clip(np.rint(frame), 0, 255).astype(np.uint8)
 
-    # Tùy chọn downscale để tăng tốc
+    # Tùy chọn downscale để tăng tốc — BOX (area averaging) nhanh hơn
+    # BILINEAR khi scale mạnh và giữ thống kê histogram màu tốt hơn;
+    # thumbnail giữ aspect in-place, np.asarray không copy thêm lần nữa
     if resize_to:
         h, w = frame.shape[:2]
-        scale = resize_to / max(h, w) if max(h, w) > resize_to else 1.0
-        if scale < 1.0:
-            new_size = (int(w * scale), int(h * scale))
-            frame = np.array(Image.fromarray(frame).resize(new_size, Image.BILINEAR), dtype=np.uint8)
+        if max(h, w) > resize_to:
+            im = Image.fromarray(frame)
+            im.thumbnail((resize_to, resize_to), Image.Resampling.BOX)
+            frame = np.asarray(im)
 
-    # Tùy chọn lượng tử hoá màu (gom cụm màu gần nhau)
+    total = frame.shape[0] * frame.shape[1]
+    if total == 0:
+        return []
+
+    # Fast path cho frame ít màu (cartoon/UI/posterized): getcolors của
+    # PIL đếm chính xác bằng hash table trong C, O(n); trả None khi quá
+    # maxcolors -> rơi xuống các đường đếm bên dưới.
+    if not (quantize and quantize > 1):
+        pairs = Image.fromarray(frame).getcolors(maxcolors=max(1024, top_k * 32))
+        if pairs is not None:
+            pairs.sort(key=lambda p: -p[0])
+            results = []
+            for cnt, rgb in pairs[:top_k]:
+                r, g, b = (int(c) for c in rgb)
+                item: Dict[str, object] = {"rgb": (r, g, b), "count": int(cnt),
+                                           "ratio": cnt / total}
+                if return_hex:
+                    item["hex"] = f"#{r:02X}{g:02X}{b:02X}"
+                results.append(item)
+            if include_conversions:
+                _attach_conversions(results)
+            return results
+
+    # Lượng tử hoá: đếm thẳng trên chỉ số bin (B^3 bin, B=ceil(256/q) —
+    # với q=16 bảng histogram chỉ 4096 entry, nằm gọn trong L1) rồi tái
+    # tạo tâm bin; không rescale về uint8, không sort.
     if quantize and quantize > 1:
         q = int(quantize)
-        frame = (frame.astype(np.int16) // q) * q + q // 2
-        frame = np.clip(frame, 0, 255).astype(np.uint8)
+        B = -(-256 // q)  # ceil
+        if HAS_NUMBA:
+            # kernel compiled: không cần mảng idx uint32 trung gian
+            stripes = min(frame.shape[0], (os.cpu_count() or 4) * 2)
+            counts = _hist_rgb(np.ascontiguousarray(frame), q, B,
+                               max(1, stripes))
+        else:
+            qidx = (frame // q).astype(np.uint32)
+            keys = (qidx[..., 0] * B + qidx[..., 1]) * B + qidx[..., 2]
+            counts = np.bincount(keys.ravel(), minlength=B * B * B)
+        unpack = lambda key: (min(255, (key // (B * B)) * q + q // 2),
+                              min(255, ((key // B) % B) * q + q // 2),
+                              min(255, (key % B) * q + q // 2))
+    elif method == "octree":
+        # Median-cut/octree của PIL chạy trong C: palette + mảng index
+        # trong O(n), bincount trên index nhỏ — đúng cái hàm này cần
+        # ("màu trội"), rẻ hơn nhiều so với đếm đủ 16M key.
+        pal = Image.fromarray(frame).quantize(
+            colors=min(256, max(top_k * 8, top_k)),
+            method=Image.Quantize.FASTOCTREE,
+        )
+        counts = np.bincount(np.asarray(pal).ravel())
+        palette = np.array(pal.getpalette()[:counts.size * 3]).reshape(-1, 3)
+        unpack = lambda key: palette[key]
+    else:
+        # "exact": pad RGB -> RGBX rồi view phẳng uint32 — mỗi pixel
+        # thành một scalar native-width không cần shift/or; unique sort
+        # trên uint32 liên tục nhanh hơn hẳn structured 3-byte record và
+        # không cần bảng bincount 16M entry.
+        rgbx = np.empty(frame.shape[:2] + (4,), np.uint8)
+        rgbx[..., :3] = frame
+        rgbx[..., 3] = 0
+        keys = rgbx.reshape(-1).view(np.uint32)
+        nz, nz_counts = np.unique(keys, return_counts=True)
+        # Thứ tự byte trong key phụ thuộc endianness của view uint32:
+        # little-endian key = R | G<<8 | B<<16, big-endian key = R<<24 |
+        # G<<16 | B<<8 — shift phải gate theo sys.byteorder kẻo R/B tráo chỗ.
+        if sys.byteorder == "little":
+            unpack = lambda key: (key & 255, (key >> 8) & 255, (key >> 16) & 255)
+        else:
+            unpack = lambda key: ((key >> 24) & 255, (key >> 16) & 255, (key >> 8) & 255)
+        counts = None
 
-    # Đếm nhanh bằng numpy.unique trên dtype cấu trúc
-    pixels = frame.reshape(-1, 3)
-    dtype = np.dtype([("r", np.uint8), ("g", np.uint8), ("b", np.uint8)])
-    structured = pixels.view(dtype)
-    uniques, counts = np.unique(structured, return_counts=True)
-
-    if counts.size == 0:
-        return []
+    if counts is not None:
+        nz = np.flatnonzero(counts)
+        nz_counts = counts[nz]
 
     # Lấy top_k bằng argpartition (O(n))
-    k = min(top_k, counts.size)
-    idx = np.argpartition(-counts, kth=k - 1)[:k]
-    idx = idx[np.argsort(-counts[idx])]  # sắp xếp lại theo count giảm dần
+    k = min(top_k, nz.size)
+    idx = np.argpartition(-nz_counts, kth=k - 1)[:k]
+    idx = idx[np.argsort(-nz_counts[idx])]  # sắp xếp lại theo count giảm dần
 
-    total = pixels.shape[0]
     results: List[Dict] = []
     for i in idx:
-        r, g, b = int(uniques[i]["r"]), int(uniques[i]["g"]), int(uniques[i]["b"])
-        cnt = int(counts[i])
+        r, g, b = (int(c) for c in unpack(int(nz[i])))
+        cnt = int(nz_counts[i])
         item: Dict[str, object] = {"rgb": (r, g, b), "count": cnt, "ratio": cnt / total}
         if return_hex:
             item["hex"] = f"#{r:02X}{g:02X}{b:02X}"
         results.append(item)
 
+    if include_conversions:
+        _attach_conversions(results)
+
     return results
 
 
+def _attach_conversions(results: List[Dict]) -> None:
+    """Gắn hsl/hsv/cmyk per màu bằng một lượt convert_colors_batch."""
+    if not results:
+        return
+    batch = convert_colors_batch(
+        np.array([item["rgb"] for item in results], dtype=np.uint8))
+    for j, item in enumerate(results):
+        item["hsl"] = tuple(batch["hsl"][j])
+        item["hsv"] = tuple(batch["hsv"][j])
+        item["cmyk"] = tuple(batch["cmyk"][j])
+
+
 Number = Union[int, float]
 RGB  = Tuple[int, int, int]
 RGBA = Tuple[int, int, int, int]
@@ -108,7 +314,10 @@ HSL_FUNC_RE  = re.compile(r"^hsla?\((.+)\)$", re.IGNORECASE)
 HSV_FUNC_RE  = re.compile(r"^hsva?\((.+)\)$", re.IGNORECASE)
 
 def _clamp_byte(x: Number) -> int:
-    return max(0, min(255, int(round(x))))
+    # round-half-up + hai so sánh thay cho chuỗi max/min/round builtin
+    # (~3 call Python per kênh, gọi 3-4 lần mỗi lần parse màu)
+    i = int(x + 0.5) if x >= 0 else int(x - 0.5)
+    return 0 if i < 0 else 255 if i > 255 else i
 
 def _parse_channel(tok: str, base: int = 255) -> int:
     tok = tok.strip()
@@ -147,18 +356,22 @@ def _parse_hex(s: str) -> RGBA:
         raise ValueError("Invalid hex length")
     return (r, g, b, a)
 
+# Compile một lần — re.split mỗi call vẫn mất một lần tra cache nội bộ
+_SPLIT_RE = re.compile(r"[,\s]+")
+
 def _split_args(argstr: str) -> list[str]:
     # supports commas or spaces or slashes e.g. "255 0 0 / 0.5"
     # Normalize separators
     argstr = argstr.replace('/', ' , ')
-    parts = [p for p in re.split(r"[,\s]+", argstr.strip()) if p]
+    parts = [p for p in _SPLIT_RE.split(argstr.strip()) if p]
     return parts
 
-def _parse_rgb_func(s: str) -> RGBA:
-    m = RGB_FUNC_RE.match(s.strip())
-    if not m:
-        raise ValueError("Not rgb()/rgba()")
-    parts = _split_args(m.group(1))
+# Các parser tách làm hai tầng: *_args nhận thẳng phần trong ngoặc
+# (prefix đã xác định họ màu nên không cần match regex lại), còn
+# *_func giữ nguyên giao diện cũ cho caller bên ngoài.
+
+def _parse_rgb_args(argstr: str) -> RGBA:
+    parts = _split_args(argstr)
     if len(parts) not in (3,4):
         raise ValueError("rgb/rgba needs 3 or 4 components")
     r = _parse_channel(parts[0])
@@ -167,11 +380,8 @@ def _parse_rgb_func(s: str) -> RGBA:
     a = _parse_alpha(parts[3]) if len(parts) == 4 else 255
     return (r,g,b,a)
 
-def _parse_hsl_func(s: str) -> RGBA:
-    m = HSL_FUNC_RE.match(s.strip())
-    if not m:
-        raise ValueError("Not hsl()/hsla()")
-    parts = _split_args(m.group(1))
+def _parse_hsl_args(argstr: str) -> RGBA:
+    parts = _split_args(argstr)
     if len(parts) not in (3,4):
         raise ValueError("hsl/hsla needs 3 or 4 components")
     # h can be deg (e.g. 120 or 120deg). s,l are %.
@@ -182,13 +392,11 @@ def _parse_hsl_func(s: str) -> RGBA:
     a = _parse_alpha(parts[3]) if len(parts)==4 else 255
     # colorsys uses HLS (h, l, s) in 0..1
     r, g, b = colorsys.hls_to_rgb(h/360.0, l, s)
-    return (_clamp_byte(r*255), _clamp_byte(g*255), _clamp_byte(b*255), a)
+    cb = _clamp_byte
+    return (cb(r*255), cb(g*255), cb(b*255), a)
 
-def _parse_hsv_func(s: str) -> RGBA:
-    m = HSV_FUNC_RE.match(s.strip())
-    if not m:
-        raise ValueError("Not hsv()/hsva()")
-    parts = _split_args(m.group(1))
+def _parse_hsv_args(argstr: str) -> RGBA:
+    parts = _split_args(argstr)
     if len(parts) not in (3,4):
         raise ValueError("hsv/hsva needs 3 or 4 components")
     htok = parts[0].strip().lower().replace('deg','')
@@ -197,9 +405,56 @@ def _parse_hsv_func(s: str) -> RGBA:
     v = float(parts[2].strip().rstrip('%'))/100.0
     a = _parse_alpha(parts[3]) if len(parts)==4 else 255
     r, g, b = colorsys.hsv_to_rgb(h/360.0, s, v)
-    return (_clamp_byte(r*255), _clamp_byte(g*255), _clamp_byte(b*255), a)
+    cb = _clamp_byte
+    return (cb(r*255), cb(g*255), cb(b*255), a)
+
+def _parse_rgb_func(s: str) -> RGBA:
+    m = RGB_FUNC_RE.match(s.strip())
+    if not m:
+        raise ValueError("Not rgb()/rgba()")
+    return _parse_rgb_args(m.group(1))
+
+def _parse_hsl_func(s: str) -> RGBA:
+    m = HSL_FUNC_RE.match(s.strip())
+    if not m:
+        raise ValueError("Not hsl()/hsla()")
+    return _parse_hsl_args(m.group(1))
+
+def _parse_hsv_func(s: str) -> RGBA:
+    m = HSV_FUNC_RE.match(s.strip())
+    if not m:
+        raise ValueError("Not hsv()/hsva()")
+    return _parse_hsv_args(m.group(1))
+
+# prefix (3 ký tự thường) -> (regex xác nhận, parser phần trong ngoặc)
+_FUNC_DISPATCH = {
+    'rgb': (RGB_FUNC_RE, _parse_rgb_args),
+    'hsl': (HSL_FUNC_RE, _parse_hsl_args),
+    'hsv': (HSV_FUNC_RE, _parse_hsv_args),
+}
+
+@lru_cache(maxsize=512)
+def _named_rgb(s: str) -> RGB:
+    # ImageColor.getrgb đi qua dict màu Python-level — cache lại theo tên
+    return ImageColor.getrgb(s)
 
 def _rgba_from_any(color: Union[str, Tuple[int,int,int], Tuple[int,int,int,int], int]) -> RGBA:
+    # Scene lặp lại cùng vài chuỗi màu style cho hàng trăm item — cache
+    # theo input hashable; list (không hash được) đi thẳng đường parse.
+    if isinstance(color, list):
+        return _parse_rgba(tuple(color))
+    try:
+        return _parse_rgba(color)
+    except TypeError as e:
+        if "unhashable" in str(e):
+            return _parse_rgba_impl(color)
+        raise
+
+@lru_cache(maxsize=4096)
+def _parse_rgba(color) -> RGBA:
+    return _parse_rgba_impl(color)
+
+def _parse_rgba_impl(color) -> RGBA:
     # tuple
     if isinstance(color, tuple):
         if len(color) == 3:
@@ -224,24 +479,21 @@ def _rgba_from_any(color: Union[str, Tuple[int,int,int], Tuple[int,int,int,int],
         # 1) hex (#rgb, #rgba, #rrggbb, #rrggbbaa)
         if HEX_RE.match(s):
             return _parse_hex(s)
-        # 2) rgb()/rgba()
-        try:
-            return _parse_rgb_func(s)
-        except ValueError:
-            pass
-        # 3) hsl()/hsla()
-        try:
-            return _parse_hsl_func(s)
-        except ValueError:
-            pass
-        # 4) hsv()/hsva()
-        try:
-            return _parse_hsv_func(s)
-        except ValueError:
-            pass
+        # 2..4) rgb()/hsl()/hsv(): dispatch O(1) theo prefix — match regex
+        # đúng một lần, parser nhận thẳng phần trong ngoặc, không
+        # exception nào bị raise/catch trên happy path
+        entry = _FUNC_DISPATCH.get(s[:3].lower())
+        if entry is not None:
+            pattern, parse_args = entry
+            m = pattern.match(s)
+            if m is not None:
+                try:
+                    return parse_args(m.group(1))
+                except ValueError:
+                    pass
         # 5) named colors or other strings Pillow understands (also supports "rgb(…)" and "hsl(…)" without alpha)
         try:
-            r,g,b = ImageColor.getrgb(s)
+            r,g,b = _named_rgb(s)
             return (r,g,b,255)
         except Exception:
             pass
@@ -275,13 +527,79 @@ def _rgb_to_cmyk(rgb: RGB) -> Tuple[float,float,float,float]:
     y = (1-b-k)/(1-k)
     return (c*100.0, m*100.0, y*100.0, k*100.0)
 
+def convert_colors_batch(rgb_array: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Chuyển đổi HÀNG LOẠT RGB -> HSL/HSV/CMYK trên mảng (N,3) uint8:
+    một lượt numpy thay vì gọi colorsys scalar per màu (đáng kể khi
+    convert cả palette từ top_colors_first_frame).
+
+    Returns
+    -------
+    Dict các mảng: "rgb" (N,3) uint8, "hsl"/"hsv" (N,3) float
+    (H độ 0..360, S/L/V %), "cmyk" (N,4) float (%) — cùng quy ước
+    với convert_color.
+    """
+    if HAS_NUMBA:
+        arr_u8 = np.ascontiguousarray(np.asarray(rgb_array, dtype=np.uint8)[:, :3])
+        n = arr_u8.shape[0]
+        hsl = np.empty((n, 3))
+        hsv = np.empty((n, 3))
+        cmyk = np.empty((n, 4))
+        _rgb_to_all(arr_u8, hsl, hsv, cmyk)
+        return {"rgb": arr_u8, "hsl": hsl, "hsv": hsv, "cmyk": cmyk}
+
+    arr = np.asarray(rgb_array, dtype=np.float64)[:, :3] / 255.0
+    r, g, b = arr[:, 0], arr[:, 1], arr[:, 2]
+    maxc = arr.max(axis=1)
+    minc = arr.min(axis=1)
+    delta = maxc - minc
+    safe_delta = np.where(delta == 0.0, 1.0, delta)
+
+    # Hue chung cho HSL/HSV (quy ước colorsys)
+    h = np.where(
+        maxc == r, ((g - b) / safe_delta) % 6.0,
+        np.where(maxc == g, (b - r) / safe_delta + 2.0,
+                 (r - g) / safe_delta + 4.0),
+    ) * 60.0
+    h = np.where(delta == 0.0, 0.0, h) % 360.0
+
+    # HSV
+    v = maxc
+    s_hsv = np.where(maxc == 0.0, 0.0, delta / np.where(maxc == 0.0, 1.0, maxc))
+
+    # HSL
+    l = (maxc + minc) / 2.0
+    denom = np.where(l <= 0.5, maxc + minc, 2.0 - maxc - minc)
+    s_hsl = np.where(delta == 0.0, 0.0, delta / np.where(denom == 0.0, 1.0, denom))
+
+    # CMYK
+    k = 1.0 - maxc
+    inv = np.where(k == 1.0, 1.0, 1.0 - k)
+    c = np.where(k == 1.0, 0.0, (1.0 - r - k) / inv)
+    m = np.where(k == 1.0, 0.0, (1.0 - g - k) / inv)
+    y = np.where(k == 1.0, 0.0, (1.0 - b - k) / inv)
+
+    return {
+        "rgb": np.asarray(rgb_array, dtype=np.uint8)[:, :3],
+        "hsl": np.stack([h, s_hsl * 100.0, l * 100.0], axis=1),
+        "hsv": np.stack([h, s_hsv * 100.0, v * 100.0], axis=1),
+        "cmyk": np.stack([c, m, y, k], axis=1) * 100.0,
+    }
+
 def convert_color(color: Union[str, Tuple[int,int,int], Tuple[int,int,int,int], int]) -> Dict[str, object]:
     """
     Nhận vào: tên màu, hex (#rgb/#rgba/#rrggbb/#rrggbbaa), rgb()/rgba(), hsl()/hsla(), hsv()/hsva(),
               tuple RGB/RGBA, hoặc int (0xRRGGBB / 0xRRGGBBAA)
     Trả về: dict đầy đủ các loại mã màu.
+
+    Kết quả được memoize theo RGBA đã parse; mỗi call trả một dict copy
+    nên caller mutate thoải mái không ảnh hưởng cache.
     """
-    r,g,b,a = _rgba_from_any(color)
+    return dict(_convert_rgba(_rgba_from_any(color)))
+
+@lru_cache(maxsize=1024)
+def _convert_rgba(rgba: RGBA) -> Dict[str, object]:
+    r,g,b,a = rgba
 
     hex_rgb  = _to_hex_rgb((r,g,b))
     hex_rgba = _to_hex_rgba((r,g,b,a))
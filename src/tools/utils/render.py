@@ -1,18 +1,79 @@
 
-from typing import Union
+from typing import Optional, Union
 import os
+import subprocess
+from functools import lru_cache
 from moviepy import VideoClip, CompositeVideoClip
+from moviepy.config import FFMPEG_BINARY
+from tools.graphics import _lifecycle
+
+@lru_cache(maxsize=1)
+def _available_hw_encoders() -> frozenset:
+    """Tập encoder phần cứng mà ffmpeg trên máy hỗ trợ (probe một lần)."""
+    try:
+        out = subprocess.run(
+            [FFMPEG_BINARY, "-hide_banner", "-encoders"],
+            capture_output=True, text=True, timeout=10,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return frozenset()
+    if out.returncode != 0:
+        return frozenset()
+    return frozenset(
+        name for name in ("h264_nvenc", "hevc_nvenc", "h264_videotoolbox")
+        if name in out.stdout
+    )
+
+def _resolve_hwaccel(hwaccel: Optional[str]) -> Optional[str]:
+    if hwaccel == "auto":
+        encoders = _available_hw_encoders()
+        if "h264_nvenc" in encoders:
+            return "nvenc"
+        if "h264_videotoolbox" in encoders:
+            return "videotoolbox"
+        return None
+    return hwaccel
+
+def _write_gif_palette(clip, output_path: str, fps: int,
+                       verbose: bool) -> None:
+    """
+    Encode gif hai pass palettegen/paletteuse trong MỘT process ffmpeg
+    (filtergraph split) — palette toàn cục một lần thay vì tính lại
+    per frame như gif writer của MoviePy, file nhỏ hơn ~10x.
+    """
+    w, h = clip.size
+    cmd = [
+        FFMPEG_BINARY, "-y",
+        "-loglevel", "info" if verbose else "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24",
+        "-s", f"{w}x{h}", "-r", str(fps), "-i", "-",
+        "-filter_complex",
+        "[0:v]split[a][b];[a]palettegen[p];[b][p]paletteuse",
+        output_path,
+    ]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    try:
+        for frame in clip.iter_frames(fps=fps, dtype="uint8"):
+            proc.stdin.write(frame.tobytes())
+    finally:
+        proc.stdin.close()
+        proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg gif encode failed (code {proc.returncode})")
 
 def render_clip(
     clip: Union[VideoClip, CompositeVideoClip],
     output_path: str,
     fps: int = 30,
     codec: str = "libx264",
-    bitrate: str = "4000k",
+    bitrate: Optional[str] = None,
     audio: bool = True,
-    preset: str = "medium",
+    preset: Optional[str] = None,
     threads: int = 4,
-    verbose: bool = True
+    verbose: bool = True,
+    close_sources: bool = False,
+    hwaccel: Optional[str] = None,
+    mode: str = "draft",
 ) -> None:
     """
     Render một MoviePy clip ra file video/gif.
@@ -22,16 +83,47 @@ def render_clip(
         output_path (str): Đường dẫn file xuất (mp4 hoặc gif).
         fps (int, optional): Frames per second. Mặc định 30.
         codec (str, optional): Codec video (vd: libx264, libx265, vp9).
-        bitrate (str, optional): Bitrate video (vd: 4000k).
+        bitrate (str, optional): Bitrate video (vd: 4000k). None -> theo mode.
         audio (bool, optional): Có xuất audio hay không.
-        preset (str, optional): Preset ffmpeg (ultrafast, superfast, fast, medium, slow).
+        preset (str, optional): Preset ffmpeg (ultrafast, superfast, fast,
+            medium, slow). None -> theo mode.
         threads (int, optional): Số luồng render.
         verbose (bool, optional): Có in log hay không.
+        close_sources (bool, optional): Đóng mọi VideoFileClip đã mở
+            (qua _lifecycle) sau khi render xong để giải phóng reader ffmpeg.
+            Mặc định False — đóng reader làm clip đang giữ trở thành
+            không render lại được (workflow draft -> final render cùng
+            một clip hai lần). Chỉ bật ở lần render CUỐI của clip, hoặc
+            tự gọi _lifecycle.close_all() khi xong hẳn.
+        hwaccel (str, optional): Encoder phần cứng — "nvenc" (NVIDIA),
+            "videotoolbox" (Apple Silicon), "auto" (probe ffmpeg rồi
+            chọn), hoặc None dùng codec CPU như cũ. Encode là phần
+            chiếm thời gian nhất của pipeline; NVENC đẩy nó sang ASIC
+            riêng trên GPU.
+        mode (str, optional): "draft" (mặc định) ưu tiên tốc độ cho
+            preview lặp (veryfast + CRF 26, không ép bitrate);
+            "final" giữ chất lượng xuất bản (medium + 4000k).
     """
+    # Resolve preset/bitrate theo mode khi caller không chỉ định
+    if mode == "draft":
+        preset = preset or "veryfast"
+        ffmpeg_params = ["-crf", "26"] if bitrate is None else None
+    else:
+        preset = preset or "medium"
+        bitrate = bitrate or "4000k"
+        ffmpeg_params = None
+
+    hwaccel = _resolve_hwaccel(hwaccel)
+    if hwaccel == "nvenc":
+        codec = "h264_nvenc"
+        preset = "p4"  # thang preset riêng của NVENC (p1..p7)
+        ffmpeg_params = ["-rc", "vbr", "-gpu", "0"]
+    elif hwaccel == "videotoolbox":
+        codec = "h264_videotoolbox"
 
     ext = os.path.splitext(output_path)[1].lower()
     if ext == ".gif":
-        clip.write_gif(output_path, fps=fps, program="ffmpeg", logger=verbose)
+        _write_gif_palette(clip, output_path, fps, verbose)
     else:
         clip.write_videofile(
             output_path,
@@ -41,6 +133,9 @@ def render_clip(
             audio=audio,
             preset=preset,
             threads=threads,
+            ffmpeg_params=ffmpeg_params,
         )
+    if close_sources:
+        _lifecycle.close_all()
     if verbose:
         print(f"✅ Render hoàn tất: {output_path}")